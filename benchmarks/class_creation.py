@@ -0,0 +1,81 @@
+""" Benchmark class creation with SecretNameMeta
+
+Measures the time to import pyyyc_v16, to create WithSpecialProps
+classes with 10 to 1000 props, and to finalize them (the code
+generation deferred to the first instance).
+
+    python benchmarks/class_creation.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyyyc_v16  # noqa: E402
+
+
+PROP_TYPES = [
+    pyyyc_v16.StrProp,
+    pyyyc_v16.IntProp,
+    pyyyc_v16.FloatProp,
+    pyyyc_v16.ColorProp,
+]
+SIZES = [10, 100, 1000]
+
+
+def make_attrs(nprops):
+    return dict(
+        ('prop{}'.format(i), PROP_TYPES[i % 4]('Prop {}'.format(i)))
+        for i in range(nprops)
+    )
+
+
+def create_class(nprops):
+    return pyyyc_v16.SecretNameMeta(
+        str('Schema{}'.format(nprops)),
+        (pyyyc_v16.WithSpecialProps,),
+        make_attrs(nprops)
+    )
+
+
+def time_import(repeat=5):
+    cmd = [sys.executable, '-c', 'import time; t = time.time(); '
+           'import pyyyc_v16; print(time.time() - t)']
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return min(
+        float(subprocess.check_output(cmd, cwd=root)) for _ in range(repeat)
+    )
+
+
+def main(repeat=5):
+    print('import pyyyc_v16: {:.2f} ms'.format(1000*time_import(repeat)))
+    print('{:>6} {:>12} {:>12} {:>12}'.format(
+        'props', 'attrs (ms)', 'create (ms)', 'finalize (ms)'
+    ))
+    for nprops in SIZES:
+        attrs = min(timeit.repeat(
+            lambda: make_attrs(nprops), number=1, repeat=repeat
+        ))
+        create = min(timeit.repeat(
+            lambda: create_class(nprops), number=1, repeat=repeat
+        ))
+        finalize = min(timeit.repeat(
+            'pyyyc_v16._finalize(cls)',
+            setup='cls = create_class({})'.format(nprops),
+            globals={'pyyyc_v16': pyyyc_v16, 'create_class': create_class},
+            number=1, repeat=repeat
+        ))
+        print('{:>6} {:>12.3f} {:>12.3f} {:>12.3f}'.format(
+            nprops, 1000*attrs, 1000*(create - attrs), 1000*finalize
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+""" Benchmark PyYYCPresentation across pyyyc_v00 to pyyyc_v18
+
+Runs the same workloads against every version in its own process:
+
+    construct       build an instance from keyword arguments
+    read            read each prop once
+    write           set time_limit to a valid float
+    invalid write   set time_limit to '4:30' and catch the error
+    time_per_slide  call time_per_slide()
+    strains_eyes    call strains_eyes()
+    summarize       call summarize(), printing to os.devnull
+
+v16 caches time_per_slide and strains_eyes with @derived. For those
+columns its cache is cleared before each call, which adds about the
+cost of a dict.clear(), so every version computes the result. The
+cached calls are timed separately as 'cached time_per_slide' and
+'cached strains_eyes', for versions that cache only.
+
+Times are the best of repeat runs, in nanoseconds per operation.
+Versions that fail to import, and workloads a version does not
+support, like invalid write where nothing is validated, are shown as
+'-' with the reason listed below the table.
+
+    python benchmarks/versions.py
+    python benchmarks/versions.py --save baseline.json
+    python benchmarks/versions.py --compare baseline.json
+
+--compare marks workloads more than --threshold slower than the
+baseline and exits with status 1 if there are any.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VERSIONS = ['pyyyc_v{:02d}'.format(i) for i in range(19)]
+WORKLOADS = [
+    'construct',
+    'read',
+    'write',
+    'invalid write',
+    'time_per_slide',
+    'strains_eyes',
+    'summarize',
+    'cached time_per_slide',
+    'cached strains_eyes',
+]
+DERIVED = ('time_per_slide', 'strains_eyes')
+
+KWARGS = dict(
+    presenter='Franklin',
+    topic='Metaclasses',
+    time_limit=30.,
+    nslides=12,
+    slide_color=[250, 20, 20],
+)
+VALID = 45.
+INVALID = '4:30'
+
+
+class Skip(Exception):
+    """Raised when a version cannot run a workload"""
+
+
+def _kwargs(module):
+    """ This function returns the constructor arguments for the
+    PyYYCPresentation of module. v18 models the presenter and slides
+    as their own classes, so they are built here, outside the timed
+    code.
+    """
+    if hasattr(module, 'Slide'):
+        return dict(
+            presenter=module.Person(name=KWARGS['presenter']),
+            topic=KWARGS['topic'],
+            time_limit=KWARGS['time_limit'],
+            slides=[module.Slide(slide_color=KWARGS['slide_color'])
+                    for _ in range(KWARGS['nslides'])],
+        )
+    return dict(KWARGS)
+
+
+def _statements(cls, kwargs):
+    """ This function returns the timed statement of each workload
+    for cls
+    """
+    if hasattr(cls, 'set_time_limit'):
+        write = 'obj.set_time_limit({})'
+    else:
+        write = 'obj.time_limit = {}'
+    statements = {
+        'construct': 'new(**kwargs)',
+        'read': '; '.join('obj.{}'.format(name) for name in kwargs),
+        'write': write.format('valid'),
+        'invalid write': 'try:\n    {}\nexcept errors:\n    pass'.format(
+            write.format('invalid')
+        ),
+    }
+    for name in ('time_per_slide', 'strains_eyes', 'summarize'):
+        statements[name] = 'obj.{}()'.format(name)
+    for name in DERIVED:
+        if _cached(cls, name):
+            statements['cached ' + name] = statements[name]
+            statements[name] = 'obj._cache.clear()\nobj.{}()'.format(name)
+    return statements
+
+
+def _cached(cls, name):
+    """ This function returns True if cls caches the results of the
+    method name, like the @derived methods of v16
+    """
+    return hasattr(getattr(cls, name, None), '_derived_from')
+
+
+def _check(cls, workload, namespace):
+    """ This function runs workload once untimed. It raises Skip if
+    the version does not support it.
+    """
+    obj = namespace['obj']
+    if workload in ('time_per_slide', 'strains_eyes', 'summarize'):
+        if not callable(getattr(cls, workload, None)):
+            raise Skip('no {} method'.format(workload))
+        getattr(obj, workload)()
+    if workload == 'invalid write':
+        setter = getattr(obj, 'set_time_limit', None)
+        try:
+            if setter is None:
+                obj.time_limit = INVALID
+            else:
+                setter(INVALID)
+        except namespace['errors']:
+            return
+        finally:
+            namespace['obj'] = cls(**namespace['kwargs'])
+        raise Skip('time_limit is not validated')
+
+
+def _time(stmt, namespace, repeat, target=0.02):
+    """ This function returns the best time of stmt in nanoseconds,
+    over repeat runs of enough loops to take at least target seconds
+    """
+    timer = timeit.Timer(stmt, globals=namespace)
+    number = 1
+    while timer.timeit(number) < target:
+        number *= 2
+    return 1e9*min(timer.repeat(repeat, number)) / number
+
+
+def run_version(name, workloads=WORKLOADS, repeat=5):
+    """ This function imports the version name and times workloads
+    against its PyYYCPresentation. It returns a dict with 'times',
+    mapping workload to nanoseconds per operation, and 'skipped',
+    mapping workload, or '*' if the version is unusable, to the
+    reason.
+    """
+    result = {'times': {}, 'skipped': {}}
+    try:
+        module = importlib.import_module(name)
+        cls = module.PyYYCPresentation
+        kwargs = _kwargs(module)
+        namespace = {
+            'new': cls,
+            'kwargs': kwargs,
+            'obj': cls(**kwargs),
+            'valid': VALID,
+            'invalid': INVALID,
+            'errors': (ValueError, TypeError),
+        }
+    except Exception as error:
+        result['skipped']['*'] = '{}: {}'.format(type(error).__name__, error)
+        return result
+    statements = _statements(cls, kwargs)
+    for workload in workloads:
+        if workload not in statements:
+            continue
+        try:
+            _check(cls, workload, namespace)
+            result['times'][workload] = _time(
+                statements[workload], namespace, repeat
+            )
+        except Skip as reason:
+            result['skipped'][workload] = str(reason)
+        except Exception as error:
+            result['skipped'][workload] = '{}: {}'.format(
+                type(error).__name__, error
+            )
+    return result
+
+
+def _worker(name, workloads, repeat):
+    """ This function runs one version with stdout sent to os.devnull,
+    so summarize and chatty imports do not mix with the JSON result
+    written to the real stdout
+    """
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            result = run_version(name, workloads, repeat)
+        finally:
+            sys.stdout = stdout
+    json.dump(result, stdout)
+
+
+def run(versions=VERSIONS, workloads=WORKLOADS, repeat=5):
+    """ This function runs each version in a fresh interpreter and
+    returns a results document suitable for saving as a baseline
+    """
+    results = {}
+    for name in versions:
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker', name,
+               '--repeat', str(repeat), '--workloads'] + list(workloads)
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [ROOT] + [p for p in [env.get('PYTHONPATH')] if p]
+        )
+        output = subprocess.check_output(cmd, cwd=ROOT, env=env)
+        results[name] = json.loads(output.decode('utf-8'))
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def regressions(current, baseline, threshold=0.1):
+    """ This function compares two results documents. It returns a
+    list of (version, workload, baseline ns, current ns) for each
+    workload more than threshold slower than in baseline.
+    """
+    slower = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name, {}).get('times', {})
+        for workload, time in result['times'].items():
+            if workload in before and time > before[workload]*(1 + threshold):
+                slower += [(name, workload, before[workload], time)]
+    return slower
+
+
+def report_lines(document, baseline=None, threshold=0.1):
+    """ This function yields a table of document, with the change
+    from baseline after each time if given
+    """
+    workloads = [w for w in WORKLOADS if any(
+        w in r['times'] or w in r['skipped']
+        for r in document['results'].values()
+    )]
+    widths = [max(22 if baseline else 16, len(w) + 2) for w in workloads]
+    yield '{:<10}'.format('ns/op') + ''.join(
+        '{:>{}}'.format(w, width) for w, width in zip(workloads, widths)
+    )
+    notes = []
+    for name, result in document['results'].items():
+        before = {}
+        if baseline:
+            before = baseline['results'].get(name, {}).get('times', {})
+        cells = []
+        for workload, width in zip(workloads, widths):
+            time = result['times'].get(workload)
+            if time is None:
+                cells += ['{:>{}}'.format('-', width)]
+                continue
+            cell = '{:.0f}'.format(time)
+            if workload in before:
+                change = time / before[workload] - 1
+                cell += ' {:+4.0%}{}'.format(
+                    change, '!' if change > threshold else ' '
+                )
+            cells += ['{:>{}}'.format(cell, width)]
+        yield '{:<10}'.format(name[6:]) + ''.join(cells)
+        for workload, reason in result['skipped'].items():
+            notes += ['{} {}: {}'.format(name[6:], workload, reason)]
+    if notes:
+        yield ''
+        for note in notes:
+            yield note
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--versions', nargs='+', default=VERSIONS,
+                        metavar='MODULE')
+    parser.add_argument('--workloads', nargs='+', default=WORKLOADS,
+                        choices=WORKLOADS, metavar='WORKLOAD')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='PATH',
+                        help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown flagged as a regression (0.1)')
+    parser.add_argument('--worker', metavar='MODULE', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker(args.worker, args.workloads, args.repeat)
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)
+    document = run(args.versions, args.workloads, args.repeat)
+    for line in report_lines(document, baseline, args.threshold):
+        print(line)
+    if args.save:
+        with open(args.save, 'w') as stream:
+            json.dump(document, stream, indent=2, sort_keys=True)
+    if baseline is None:
+        return 0
+    if baseline.get('python') != document['python']:
+        print('\nBaseline was run on Python {}, this is {}'.format(
+            baseline.get('python'), document['python']
+        ))
+    slower = regressions(document, baseline, args.threshold)
+    if slower:
+        print('\n{} regression(s) over {:.0%}:'.format(
+            len(slower), args.threshold
+        ))
+        for name, workload, before, time in slower:
+            print('    {} {}: {:.0f} -> {:.0f} ns'.format(
+                name, workload, before, time
+            ))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import mmap
+import struct
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+from six import string_types
+
+from pyyyc_v16 import ColorProp
+from pyyyc_v16 import ErrorTable
+from pyyyc_v16 import FloatProp
+from pyyyc_v16 import IntProp
+from pyyyc_v16 import StrProp
+from pyyyc_v16 import _MISSING
+from pyyyc_v16 import _REGISTRY
+from pyyyc_v16 import _color
+from pyyyc_v16 import _finalize
+from pyyyc_v16 import write_lines
+
+
+def record_of(instance, tag='class'):
+    """ This function returns the set props of instance as a dict,
+    tagged with the qualified name of its class
+    """
+    record = {tag: _REGISTRY.qualified_name(type(instance))}
+    for name, prop in instance._props.items():
+        try:
+            record[name] = getattr(instance, prop.secret_name)
+        except AttributeError:
+            pass
+    return record
+
+
+def dump_jsonl(instances, stream, tag='class', batch_size=1024):
+    """ This function streams instances to stream as JSON Lines """
+    write_lines(
+        (json.dumps(record_of(obj, tag)) for obj in instances),
+        stream,
+        batch_size
+    )
+
+
+def iter_records(stream, chunk_size=1 << 16):
+    """ This function reads JSON Lines from stream about chunk_size
+    bytes at a time, and yields (line number, line) for each non-blank
+    line
+    """
+    lineno = 0
+    while True:
+        lines = stream.readlines(chunk_size)
+        if not lines:
+            return
+        for line in lines:
+            lineno += 1
+            if line.strip():
+                yield lineno, line
+
+
+def _parse(line, tag, classes):
+    """ This function decodes one line and resolves its class tag
+    through _REGISTRY. It raises ValueError or KeyError if either
+    fails.
+    """
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError('{}: record must be an object'.format(record))
+    name = record.pop(tag, None)
+    if name is None:
+        raise KeyError('Record has no class tag: {}'.format(tag))
+    if not isinstance(name, string_types):
+        raise ValueError('{}: class tag must be a string'.format(name))
+    if name not in classes:
+        classes[name] = _REGISTRY[name]
+    return classes[name], record
+
+
+def _report(errors, lineno, error):
+    if errors is None:
+        raise error
+    errors.append((lineno, '{}: {}'.format(type(error).__name__, error)))
+
+
+def load_jsonl(stream, tag='class', errors=None, chunk_size=1 << 16):
+    """ This function lazily constructs instances from a JSON Lines
+    stream, one record at a time. Each record names its class in the
+    tag field. If errors is a list, invalid records are skipped and
+    (line number, message) is appended to it; otherwise the first
+    invalid record raises.
+    """
+    classes = {}
+    for lineno, line in iter_records(stream, chunk_size):
+        try:
+            cls, record = _parse(line, tag, classes)
+            instance = cls(**record)
+        except (KeyError, ValueError) as error:
+            _report(errors, lineno, error)
+            continue
+        yield instance
+
+
+def load_jsonl_bulk(stream, tag='class', errors=None, batch_size=10000,
+                    chunk_size=1 << 16):
+    """ This function constructs instances from a JSON Lines stream in
+    batches of batch_size records. Each batch is grouped by class and
+    validated column-wise with from_records, so instances come out
+    grouped by class within a batch. errors works as in load_jsonl,
+    except that every error in an invalid record is reported.
+    """
+    classes = {}
+    batch = OrderedDict()
+    count = 0
+    for lineno, line in iter_records(stream, chunk_size):
+        try:
+            cls, record = _parse(line, tag, classes)
+        except (KeyError, ValueError) as error:
+            _report(errors, lineno, error)
+            continue
+        batch.setdefault(cls, []).append((lineno, record))
+        count += 1
+        if count == batch_size:
+            for instance in _load_batch(batch, errors):
+                yield instance
+            batch = OrderedDict()
+            count = 0
+    for instance in _load_batch(batch, errors):
+        yield instance
+
+
+def _load_batch(batch, errors):
+    for cls, group in batch.items():
+        table = None if errors is None else ErrorTable()
+        instances = cls.from_records(
+            [record for _, record in group], errors=table
+        )
+        if table:
+            for row, indexes in table.by_row().items():
+                for index in indexes:
+                    _report(errors, group[row][0], table.error(index))
+        for instance in instances:
+            yield instance
+
+
+# Fixed-width binary records
+#
+# A record file is a header, count fixed-width records and a JSON
+# footer. The header is MAGIC then record size, count and footer
+# offset as little-endian u8. Each record starts with a bitmask of
+# which props are set, followed by one field per prop: FloatProp as
+# f8, IntProp as i8, ColorProp as 3 x u8 and StrProp as a u4 index
+# into the string table in the footer.
+
+MAGIC = b'PYYCREC1'
+_HEADER = struct.Struct('<8sQQQ')
+_FIELD_CODES = [
+    (FloatProp, 'd'),
+    (IntProp, 'q'),
+    (ColorProp, '3B'),
+    (StrProp, 'I'),
+]
+_LAYOUTS = WeakKeyDictionary()
+
+
+def record_layout(cls):
+    """ This function derives the binary record layout of cls from its
+    prop table. It returns the record struct and a list of
+    (name, code, offset) for each prop.
+    """
+    if cls in _LAYOUTS:
+        return _LAYOUTS[cls]
+    nflags = (len(cls._props) + 7) // 8
+    fmt = '<{}s'.format(nflags)
+    fields = []
+    for name, prop in cls._props.items():
+        for prop_type, code in _FIELD_CODES:
+            if isinstance(prop, prop_type):
+                break
+        else:
+            raise ValueError('{}: no binary layout for {}'.format(
+                name, type(prop).__name__
+            ))
+        fields += [(name, code, struct.calcsize(fmt))]
+        fmt += code
+    _LAYOUTS[cls] = struct.Struct(fmt), fields
+    return _LAYOUTS[cls]
+
+
+def write_records(path, cls, instances):
+    """ This function writes instances of cls to a binary record file
+    at path
+    """
+    record, fields = record_layout(cls)
+    secrets = [cls._props[name].secret_name for name, _, _ in fields]
+    nflags = (len(fields) + 7) // 8
+    strings = OrderedDict()
+    count = 0
+    with open(path, 'wb') as stream:
+        stream.write(_HEADER.pack(MAGIC, record.size, 0, 0))
+        for obj in instances:
+            if not isinstance(obj, cls):
+                raise ValueError('{}: must be {}'.format(obj, cls.__name__))
+            flags = 0
+            values = []
+            for i, ((name, code, _), secret) in enumerate(
+                    zip(fields, secrets)):
+                value = getattr(obj, secret, _MISSING)
+                if value is not _MISSING:
+                    flags |= 1 << i
+                if code == '3B':
+                    values += [0, 0, 0] if value is _MISSING else list(value)
+                elif code == 'I':
+                    values += [0 if value is _MISSING else
+                               strings.setdefault(value, len(strings))]
+                else:
+                    values += [0 if value is _MISSING else value]
+            try:
+                stream.write(record.pack(
+                    flags.to_bytes(nflags, 'little'), *values
+                ))
+            except struct.error as error:
+                raise ValueError('{}: {}'.format(obj, error))
+            count += 1
+        footer = stream.tell()
+        stream.write(json.dumps({
+            'class': _REGISTRY.qualified_name(cls),
+            'fields': [[name, code] for name, code, _ in fields],
+            'strings': list(strings),
+        }).encode('utf-8'))
+        stream.seek(0)
+        stream.write(_HEADER.pack(MAGIC, record.size, count, footer))
+    return count
+
+
+class RecordView(object):
+    """ class RecordView
+
+    This class is a lightweight view of one record in a RecordFile.
+    Its prop attributes are decoded from the memory-mapped buffer only
+    when read. Subclasses are generated per record layout.
+    """
+
+    __slots__ = ('_file', '_offset')
+
+    def __init__(self, record_file, offset):
+        self._file = record_file
+        self._offset = offset
+
+    def to_instance(self):
+        """Build an instance of the record class without revalidating"""
+        return self._file.cls._from_values(tuple(
+            getattr(self, name, _MISSING) if self._is_set(i) else _MISSING
+            for i, name in enumerate(self._file.cls._props)
+        ))
+
+    def _is_set(self, index):
+        return self._file.buffer[self._offset + index // 8] >> (index % 8) & 1
+
+    def __repr__(self):
+        return '<{} record at {}>'.format(
+            self._file.cls.__name__, self._offset
+        )
+
+
+def _field(index, name, code, offset):
+    unpack = struct.Struct('<' + code).unpack_from
+
+    def fget(self):
+        if not self._is_set(index):
+            raise ValueError('{}: property not set'.format(name))
+        value = unpack(self._file.buffer, self._offset + offset)
+        if code == '3B':
+            return _color((value[0] << 16) | (value[1] << 8) | value[2])
+        if code == 'I':
+            return self._file.strings[value[0]]
+        return value[0]
+    return property(fget)
+
+
+class RecordFile(object):
+    """ class RecordFile
+
+    This class memory-maps a binary record file written by
+    write_records and hands out RecordViews of its records
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+        magic, self.record_size, self.count, footer = _HEADER.unpack_from(
+            self.buffer
+        )
+        if magic != MAGIC:
+            raise ValueError('{}: not a record file'.format(path))
+        meta = json.loads(bytes(self.buffer[footer:]).decode('utf-8'))
+        self.cls = _REGISTRY[meta['class']]
+        _finalize(self.cls)
+        record, fields = record_layout(self.cls)
+        if ([[name, code] for name, code, _ in fields] != meta['fields'] or
+                record.size != self.record_size):
+            raise ValueError('{}: layout does not match {}'.format(
+                path, self.cls.__name__
+            ))
+        self.strings = meta['strings']
+        self._view = type(
+            str('{}View'.format(self.cls.__name__)), (RecordView,),
+            dict(
+                [('__slots__', ())] +
+                [(name, _field(i, name, code, offset))
+                 for i, (name, code, offset) in enumerate(fields)]
+            )
+        )
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('record index out of range')
+        return self._view(self, _HEADER.size + index*self.record_size)
+
+    def __iter__(self):
+        view, size = self._view, self.record_size
+        for offset in range(_HEADER.size, _HEADER.size + self.count*size,
+                            size):
+            yield view(self, offset)
+
+    def close(self):
+        self.buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
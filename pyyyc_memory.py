@@ -0,0 +1,166 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import gc
+import sys
+import tracemalloc
+from collections import Counter
+from collections import OrderedDict
+
+from pyyyc_v16 import _MISSING
+from pyyyc_v16 import _REGISTRY
+
+
+def _deep_size(value, seen):
+    """ This function returns the size of value and the containers it
+    holds, counting objects whose id is already in seen as 0
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    elif isinstance(value, dict):
+        size += sum(
+            _deep_size(key, seen) + _deep_size(item, seen)
+            for key, item in value.items()
+        )
+    return size
+
+
+class ClassFootprint(object):
+    """ class ClassFootprint
+
+    This class holds the memory footprint of the live instances of one
+    WithSpecialProps class. Sizes are averages in bytes over the
+    sampled instances. For each prop, props holds (size, amortized,
+    duplicate, fraction set). size counts every value in full;
+    amortized counts a value object shared between instances, like an
+    interned Color, only once; duplicate is the part of amortized spent
+    on separate but equal copies, like repeated topic strings, that
+    interning would save. overhead is the instance itself plus its
+    __dict__, if any.
+    """
+
+    def __init__(self, name, count, sampled):
+        self.name = name
+        self.count = count
+        self.sampled = sampled
+        self.instance = 0.
+        self.dict = 0.
+        self.cache = 0.
+        self.props = OrderedDict()
+        self.sites = []
+
+    @property
+    def overhead(self):
+        return self.instance + self.dict
+
+    @property
+    def values(self):
+        return sum(size for size, _, _, _ in self.props.values())
+
+    @property
+    def total(self):
+        """Estimated bytes for all live instances, shared values
+        counted once"""
+        return self.count*(
+            self.overhead + self.cache +
+            sum(amortized for _, amortized, _, _ in self.props.values())
+        )
+
+    def __repr__(self):
+        return '<ClassFootprint {}: {} instances, ~{:.0f} bytes>'.format(
+            self.name, self.count, self.total
+        )
+
+
+def _measure(cls, instances, count):
+    fp = ClassFootprint(_REGISTRY.qualified_name(cls), count, len(instances))
+    if not instances:
+        return fp
+    n = len(instances)
+    fp.instance = sum(sys.getsizeof(obj) for obj in instances) / n
+    fp.dict = sum(
+        sys.getsizeof(obj.__dict__)
+        for obj in instances if hasattr(obj, '__dict__')
+    ) / n
+    fp.cache = sum(
+        _deep_size(getattr(obj, '_cache', {}), set())
+        for obj in instances if getattr(obj, '_cache', None) is not None
+    ) / n
+    for name, prop in cls._props.items():
+        size = amortized = duplicate = nset = 0
+        shared = set()
+        first = {}
+        for obj in instances:
+            value = getattr(obj, prop.secret_name, _MISSING)
+            if value is _MISSING:
+                continue
+            nset += 1
+            size += _deep_size(value, set())
+            extra = _deep_size(value, shared)
+            amortized += extra
+            try:
+                if first.setdefault(value, id(value)) != id(value):
+                    duplicate += extra
+            except TypeError:
+                pass
+        fp.props[name] = (
+            size / n, amortized / n, duplicate / n, nset / n
+        )
+    if tracemalloc.is_tracing():
+        sites = Counter()
+        for obj in instances:
+            trace = tracemalloc.get_object_traceback(obj)
+            if trace is not None:
+                sites[str(trace[0])] += 1
+        fp.sites = sites.most_common(3)
+    return fp
+
+
+def footprint(classes=None, sample=10000):
+    """ This function measures the live instances of classes, or of
+    every class in _REGISTRY. It counts all instances in one pass over
+    gc.get_objects, without collecting, and measures up to sample of
+    each class. If tracemalloc is tracing, the most common allocation
+    sites of the sampled instances are included. It returns a list of
+    ClassFootprint, largest first.
+    """
+    if classes is None:
+        classes = list(_REGISTRY.values())
+    classes = set(classes)
+    counts = Counter()
+    samples = dict((cls, []) for cls in classes)
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in classes:
+            counts[cls] += 1
+            if len(samples[cls]) < sample:
+                samples[cls].append(obj)
+    footprints = [
+        _measure(cls, samples.pop(cls), counts[cls]) for cls in classes
+    ]
+    return sorted(footprints, key=lambda fp: fp.total, reverse=True)
+
+
+def report_lines(footprints):
+    """ This function yields a readable report of footprints """
+    for fp in footprints:
+        yield '{}: {} instances, ~{:.0f} bytes total'.format(
+            fp.name, fp.count, fp.total
+        )
+        if not fp.sampled:
+            continue
+        yield '    object {:.0f} + __dict__ {:.0f} + cache {:.0f} bytes ' \
+              'per instance'.format(fp.instance, fp.dict, fp.cache)
+        for name, (size, amortized, duplicate, nset) in fp.props.items():
+            yield '    {:<16} {:>8.1f} bytes, {:>8.1f} amortized, {:>8.1f} ' \
+                  'duplicated, {:.0%} set'.format(
+                      name, size, amortized, duplicate, nset
+                  )
+        for site, hits in fp.sites:
+            yield '    allocated at {} ({} sampled)'.format(site, hits)
@@ -0,0 +1,254 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import random
+
+import pyyyc_io
+from pyyyc_v16 import COLORS_NAMED
+from pyyyc_v16 import ColorProp
+from pyyyc_v16 import FloatProp
+from pyyyc_v16 import IntProp
+from pyyyc_v16 import StrProp
+from pyyyc_v16 import _REGISTRY
+from pyyyc_v16 import write_lines
+
+
+# Synthetic records
+#
+# Each prop type has a factory for valid values and a list of labelled
+# factories for invalid ones. A factory takes the Random of a
+# generator and returns a function of no arguments that makes one
+# value, so the per-value work is only a few random bits and a lookup
+# into a pool built up front.
+
+_WORDS = (
+    'python data metaclasses descriptors properties slots generators '
+    'decorators asyncio typing numpy pandas testing packaging wheels '
+    'pickling caching profiling parsing plotting notebooks gis '
+    'geophysics meetups calgary zoë café naïve résumé'
+).split()
+_NAMES = (
+    'Ada Alan Barbara Dennis Edsger Frances Grace Guido Jean Katherine '
+    'Ken Linus Margaret Niklaus Radia Sophie Tim Yukihiro Zoë Łukasz'
+).split()
+_COLOR_NAMES = sorted(COLORS_NAMED)
+_POOL_BITS = 10
+
+
+def _pool(rng, make):
+    """ This function returns a function that picks from a pool of
+    1 << _POOL_BITS values made by make
+    """
+    pool = [make() for _ in range(1 << _POOL_BITS)]
+    bits = rng.getrandbits
+    return lambda: pool[bits(_POOL_BITS)]
+
+
+def _str(rng):
+    def make():
+        if rng.random() < 0.5:
+            return '{} {}'.format(rng.choice(_NAMES), rng.choice(_NAMES))
+        return ' '.join(
+            rng.choice(_WORDS) for _ in range(rng.randint(1, 5))
+        ).capitalize()
+    return _pool(rng, make)
+
+
+def _float(rng):
+    return _pool(rng, lambda: rng.randint(2, 240) / 2)
+
+
+def _int(rng):
+    return _pool(rng, lambda: rng.randint(1, 200))
+
+
+def _color(rng):
+    bits = rng.getrandbits
+    names = _pool(rng, lambda: rng.choice(_COLOR_NAMES))
+
+    def make():
+        form = bits(3)
+        if form == 0:
+            return names()
+        packed = bits(24)
+        if form == 1:
+            return '#{:06x}'.format(packed)
+        return [packed >> 16, (packed >> 8) & 255, packed & 255]
+    return make
+
+
+def _clock(rng):
+    """Time limits typed as minutes:seconds, like '4:30'"""
+    return lambda: '{}:{:02d}'.format(rng.randint(1, 90), rng.randrange(60))
+
+
+def _out_of_range(rng):
+    def make():
+        rgb = [rng.randrange(256) for _ in range(3)]
+        rgb[rng.randrange(3)] = rng.choice([-1, 256, rng.randint(257, 1000)])
+        return rgb
+    return make
+
+
+_VALUES = [
+    (StrProp, _str),
+    (FloatProp, _float),
+    (IntProp, _int),
+    (ColorProp, _color),
+]
+
+_FAULTS = [
+    (StrProp, [
+        ('int', lambda rng: lambda: rng.randint(0, 1000)),
+        ('null', lambda rng: lambda: None),
+        ('list', lambda rng: lambda: [rng.choice(_WORDS)]),
+    ]),
+    (FloatProp, [
+        ('clock string', _clock),
+        ('int', lambda rng: lambda: rng.randint(1, 120)),
+        ('numeric string', lambda rng: lambda: str(rng.randint(2, 240) / 2)),
+        ('null', lambda rng: lambda: None),
+    ]),
+    (IntProp, [
+        ('float', lambda rng: lambda: float(rng.randint(1, 200))),
+        ('numeric string', lambda rng: lambda: str(rng.randint(1, 200))),
+        ('null', lambda rng: lambda: None),
+    ]),
+    (ColorProp, [
+        ('rgb out of range', _out_of_range),
+        ('rgb wrong length', lambda rng: lambda: [
+            rng.randrange(256) for _ in range(rng.choice([0, 1, 2, 4]))
+        ]),
+        ('rgb floats', lambda rng: lambda: [
+            float(rng.randrange(256)) for _ in range(3)
+        ]),
+        ('unknown color name', lambda rng: lambda: rng.choice(_WORDS)),
+        ('bad hex', lambda rng: lambda: '#{:05x}'.format(rng.getrandbits(20))),
+    ]),
+]
+
+
+def _lookup(table, prop, name):
+    for prop_type, entry in table:
+        if isinstance(prop, prop_type):
+            return entry
+    raise ValueError('{}: no generator for {}'.format(
+        name, type(prop).__name__
+    ))
+
+
+class RecordGenerator(object):
+    """ class RecordGenerator
+
+    This class generates synthetic keyword records for a
+    WithSpecialProps class, given as a class or a _REGISTRY name, with
+    values drawn by prop type. A fraction invalid of the records get
+    exactly one fault, chosen evenly from the invalid values of each
+    prop type, unknown keywords (typos and non-prop attributes of the
+    class) and private keywords. Each prop is left out of a record with
+    probability missing. Generators built with the same arguments
+    produce the same records.
+    """
+
+    def __init__(self, cls, seed=0, invalid=0., missing=0.):
+        if not isinstance(cls, type):
+            cls = _REGISTRY[cls]
+        self.cls = cls
+        self.invalid = invalid
+        self.missing = missing
+        self._rng = rng = random.Random(seed)
+        props = cls._props
+        self._values = [
+            (name, _lookup(_VALUES, prop, name)(rng))
+            for name, prop in props.items()
+        ]
+        self._faults = [
+            (name, '{}: {}'.format(name, label), fault(rng))
+            for name, prop in props.items()
+            for label, fault in _lookup(_FAULTS, prop, name)
+        ]
+        unknown = sorted(
+            set([name + 's' for name in props] + [name[:-1] for name in props])
+            .union(n for n in dir(cls) if n[:1] != '_') - set(props) - {''}
+        )
+        private = sorted(
+            ['_' + name for name in props] + ['_cache', '__class__']
+        )
+        self._faults += [
+            (None, 'unknown keyword', self._keyword(unknown)),
+            (None, 'private keyword', self._keyword(private)),
+        ]
+
+    def _keyword(self, names):
+        rng = self._rng
+        values = [make for _, make in self._values]
+        if not values:
+            values = [lambda: rng.choice(_WORDS)]
+        return lambda: (rng.choice(names), rng.choice(values)())
+
+    def _record(self):
+        record = {}
+        if not self.missing:
+            for name, make in self._values:
+                record[name] = make()
+            return record
+        random = self._rng.random
+        missing = self.missing
+        for name, make in self._values:
+            if random() >= missing:
+                record[name] = make()
+        return record
+
+    def labeled(self, n):
+        """Generate n (record, fault) pairs; fault is None for valid
+        records"""
+        random = self._rng.random
+        choice = self._rng.choice
+        for _ in range(n):
+            record = self._record()
+            if random() >= self.invalid:
+                yield record, None
+                continue
+            name, label, make = choice(self._faults)
+            if name is None:
+                key, value = make()
+                record[key] = value
+            else:
+                record[name] = make()
+            yield record, label
+
+    def records(self, n):
+        """Generate n records"""
+        for record, _ in self.labeled(n):
+            yield record
+
+    def instances(self, n):
+        """Generate n instances from valid records, regardless of
+        invalid"""
+        cls = self.cls
+        for _ in range(n):
+            yield cls(**self._record())
+
+    def dump_jsonl(self, stream, n, tag='class', batch_size=1024):
+        """ Write n records to stream as JSON Lines, tagged with the
+        qualified class name in the field tag, ready for
+        pyyyc_io.load_jsonl
+        """
+        name = _REGISTRY.qualified_name(self.cls)
+
+        def lines():
+            for record in self.records(n):
+                line = {tag: name}
+                line.update(record)
+                yield json.dumps(line)
+        write_lines(lines(), stream, batch_size)
+
+    def write_records(self, path, n):
+        """ Write n valid instances to a binary record file at path
+        with pyyyc_io.write_records. Invalid values cannot be stored
+        in its fixed-width fields, so invalid is ignored.
+        """
+        return pyyyc_io.write_records(path, self.cls, self.instances(n))
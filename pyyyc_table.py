@@ -0,0 +1,305 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from itertools import chain
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pyyyc_v16 import ColorProp
+from pyyyc_v16 import FloatProp
+from pyyyc_v16 import IntProp
+from pyyyc_v16 import StrProp
+from pyyyc_v16 import PyYYCPresentation
+from pyyyc_v16 import YYCjsPresentation
+
+
+class StrColumn(object):
+    """ class StrColumn
+
+    This class holds a dictionary-encoded column of strings: an array
+    of integer codes into a list of unique categories
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.categories = list(categories)
+
+    @classmethod
+    def from_values(cls, values):
+        lookup = {}
+        codes = np.fromiter(
+            (lookup.setdefault(v, len(lookup)) for v in values),
+            dtype=np.int32
+        )
+        return cls(codes, sorted(lookup, key=lookup.get))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[c] for c in self.codes)
+
+    def __eq__(self, value):
+        """Vectorized comparison against a single string"""
+        if value not in self.categories:
+            return np.zeros(len(self), dtype=bool)
+        return self.codes == self.categories.index(value)
+
+
+def _str_column(values):
+    return StrColumn.from_values(values)
+
+
+def _float_column(values):
+    return np.fromiter(values, dtype=np.float64, count=len(values))
+
+
+def _int_column(values):
+    return np.fromiter(values, dtype=np.int64, count=len(values))
+
+
+def _color_column(values):
+    return np.fromiter(
+        chain.from_iterable(values), dtype=np.uint8, count=3*len(values)
+    ).reshape(len(values), 3)
+
+
+_COLUMN_TYPES = [
+    (StrProp, _str_column),
+    (FloatProp, _float_column),
+    (IntProp, _int_column),
+    (ColorProp, _color_column),
+]
+
+_COLUMNAR = {}
+
+
+def columnar(cls, name):
+    """ This function decorates a vectorized implementation of the
+    method name on cls. It receives a PresentationTable and returns
+    one value per row.
+    """
+    def wrapper(func):
+        _COLUMNAR[(cls, name)] = func
+        return func
+    return wrapper
+
+
+class PresentationTable(object):
+    """ class PresentationTable
+
+    This class stores the SpecialProp values of many instances of a
+    WithSpecialProps class as columns. Float and int props are NumPy
+    arrays, colors are (N, 3) uint8 arrays and strings are StrColumns.
+    Derived methods registered with columnar are computed for every
+    row in one call.
+    """
+
+    def __init__(self, cls, columns):
+        self.cls = cls
+        self.columns = dict(columns)
+        lengths = set(len(self.columns[name]) for name in cls._props)
+        if len(lengths) > 1:
+            raise ValueError('Columns must all be the same length')
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_instances(cls, prop_class, instances):
+        """Build a table from instances of prop_class; all props must
+        be set"""
+        instances = list(instances)
+        columns = {}
+        for name in prop_class._props:
+            values = [getattr(obj, name) for obj in instances]
+            columns[name] = _column_type(prop_class, name)(values)
+        return cls(prop_class, columns)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def slice(self, start, stop):
+        """Build a table of rows start to stop that shares this table's
+        column data"""
+        columns = {}
+        for name, column in self.columns.items():
+            if isinstance(column, StrColumn):
+                column = StrColumn(column.codes[start:stop], column.categories)
+            else:
+                column = column[start:stop]
+            columns[name] = column
+        return PresentationTable(self.cls, columns)
+
+    def row(self, index):
+        """Build an instance of the table class from one row"""
+        kwargs = {}
+        for name in self.cls._props:
+            value = self.columns[name][index]
+            if isinstance(value, np.ndarray):
+                value = [int(v) for v in value]
+            elif isinstance(value, np.generic):
+                value = value.item()
+            kwargs[name] = value
+        return self.cls(**kwargs)
+
+    def compute(self, name):
+        """Compute the method name for every row"""
+        for cls in self.cls.__mro__:
+            if (cls, name) in _COLUMNAR:
+                return _COLUMNAR[(cls, name)](self)
+        raise ValueError('{}: no columnar implementation for {}'.format(
+            self.cls.__name__, name
+        ))
+
+    def time_per_slide(self):
+        """Time available for each slide, for every row"""
+        return self.compute('time_per_slide')
+
+    def strains_eyes(self):
+        """Determines if the slides will cause eye strain, for every
+        row"""
+        return self.compute('strains_eyes')
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching always registers the block with
+        # the resource tracker. Pool workers share the creator's
+        # tracker, so this only matters to unrelated processes.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _block_array(block, dtype, shape):
+    """ This function returns an array of dtype and shape over the
+    shared memory block. Unlike np.ndarray(buffer=...), np.frombuffer
+    holds an export of the block's buffer for as long as the array or
+    any view of it lives, so closing the block under them raises
+    BufferError instead of leaving them dangling.
+    """
+    count = int(np.prod(shape))
+    return np.frombuffer(block.buf, dtype, count).reshape(shape)
+
+
+class SharedPresentationTable(PresentationTable):
+    """ class SharedPresentationTable
+
+    This class is a PresentationTable whose arrays live in
+    multiprocessing.shared_memory blocks. Pickling it only sends the
+    block names, so worker processes attach to the same columns
+    without copying them. The creating process owns the blocks and
+    must unlink them when done; every process should close them.
+    """
+
+    def __init__(self, cls, columns, blocks=(), owner=False):
+        super(SharedPresentationTable, self).__init__(cls, columns)
+        self._blocks = list(blocks)
+        self._owner = owner
+
+    @classmethod
+    def from_table(cls, table):
+        """Copy the columns of table into new shared memory blocks"""
+        columns = {}
+        blocks = []
+        for name, column in table.columns.items():
+            array = column.codes if isinstance(column, StrColumn) else column
+            block = shared_memory.SharedMemory(
+                create=True, size=max(array.nbytes, 1)
+            )
+            blocks += [block]
+            shared = _block_array(block, array.dtype, array.shape)
+            shared[...] = array
+            if isinstance(column, StrColumn):
+                shared = StrColumn(shared, column.categories)
+            columns[name] = shared
+        return cls(table.cls, columns, blocks, owner=True)
+
+    @classmethod
+    def from_instances(cls, prop_class, instances):
+        return cls.from_table(
+            PresentationTable.from_instances(prop_class, instances)
+        )
+
+    @classmethod
+    def _attach(cls, prop_class, layout):
+        columns = {}
+        blocks = []
+        for name, block_name, dtype, shape, categories in layout:
+            block = _attach(block_name)
+            blocks += [block]
+            array = _block_array(block, np.dtype(dtype), shape)
+            if categories is not None:
+                array = StrColumn(array, categories)
+            columns[name] = array
+        return cls(prop_class, columns, blocks)
+
+    def __reduce__(self):
+        layout = []
+        blocks = iter(self._blocks)
+        for name, column in self.columns.items():
+            categories = None
+            if isinstance(column, StrColumn):
+                column, categories = column.codes, column.categories
+            layout += [(name, next(blocks).name, column.dtype.str,
+                        column.shape, categories)]
+        return SharedPresentationTable._attach, (self.cls, layout)
+
+    def close(self):
+        """Detach this process from the shared blocks. This raises
+        BufferError while columns or slices taken from the table are
+        still alive."""
+        self.columns = {}
+        for block in self._blocks:
+            block.close()
+
+    def unlink(self):
+        """Free the shared blocks; only the creating process should
+        call this"""
+        if not self._owner:
+            raise ValueError('Only the creating process may unlink')
+        for block in self._blocks:
+            block.unlink()
+        self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if self._owner:
+            self.unlink()
+        self.close()
+
+
+def _column_type(prop_class, name):
+    prop = getattr(prop_class, name)
+    for prop_type, column_type in _COLUMN_TYPES:
+        if isinstance(prop, prop_type):
+            return column_type
+    return lambda values: np.array(values, dtype=object)
+
+
+@columnar(PyYYCPresentation, 'time_per_slide')
+@columnar(YYCjsPresentation, 'time_per_slide')
+def _time_per_slide(table):
+    return table['time_limit'] / table['nslides']
+
+
+@columnar(PyYYCPresentation, 'strains_eyes')
+def _strains_eyes(table):
+    colors = table['slide_color']
+    return (colors > 200).any(axis=1) & (colors < 50).any(axis=1)
+
+
+@columnar(YYCjsPresentation, 'strains_eyes')
+def _never_strains_eyes(table):
+    return np.zeros(len(table), dtype=bool)
@@ -0,0 +1,459 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from functools import wraps
+
+from pyyyc_v16 import WithSpecialProps
+from pyyyc_v16 import _REGISTRY
+from pyyyc_v16 import _finalize
+
+
+class RingBuffer(object):
+    """ class RingBuffer
+
+    This class keeps the last size items recorded, in a deque with
+    maxlen size. Appending to and copying a deque are each one step
+    in CPython, so threads can record without a lock: items() is a
+    snapshot in the order the records finished, and never skips or
+    repeats an item.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._items = deque(maxlen=size)
+
+    def record(self, item):
+        self._items.append(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self):
+        """Recorded items, oldest first"""
+        return list(self._items.copy())
+
+
+_SUB_BITS = 3
+_NBUCKETS = (40 << _SUB_BITS)
+
+
+def _bucket(nanoseconds):
+    """ This function returns the histogram bucket of a latency. Each
+    power of two is split into 2**_SUB_BITS buckets, so bucket bounds
+    are within 12.5% of any latency in them.
+    """
+    if nanoseconds < (1 << _SUB_BITS):
+        return max(nanoseconds, 0)
+    shift = nanoseconds.bit_length() - _SUB_BITS - 1
+    return min(
+        ((shift + 1) << _SUB_BITS) + (nanoseconds >> shift) -
+        (1 << _SUB_BITS),
+        _NBUCKETS - 1
+    )
+
+
+def _bucket_bound(index):
+    """ This function returns the upper bound of bucket index in
+    seconds
+    """
+    if index < (1 << _SUB_BITS):
+        return (index + 1) / 1e9
+    shift = (index >> _SUB_BITS) - 1
+    low = ((index & ((1 << _SUB_BITS) - 1)) + (1 << _SUB_BITS)) << shift
+    return (low + (1 << shift)) / 1e9
+
+
+class Histogram(object):
+    """ class Histogram
+
+    This class counts latencies in fixed logarithmic buckets, from 1ns
+    to about 18 minutes, in a preallocated array, so recording a
+    sample does not keep any new objects
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('q', bytes(8*_NBUCKETS))
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def record(self, seconds):
+        self.counts[_bucket(int(seconds*1e9))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, hits in enumerate(self.counts):
+            seen += hits
+            if hits and seen >= rank:
+                return min(_bucket_bound(index), self.max)
+        return self.max
+
+    def buckets(self):
+        """(upper bound in seconds, count) for each non-empty bucket"""
+        return [
+            (_bucket_bound(index), hits)
+            for index, hits in enumerate(self.counts) if hits
+        ]
+
+    def snapshot(self):
+        return dict(
+            count=self.count, sum=self.total, max=self.max,
+            p50=self.percentile(50), p90=self.percentile(90),
+            p99=self.percentile(99), p999=self.percentile(99.9),
+            buckets=self.buckets(),
+        )
+
+
+class PropStats(object):
+    """ class PropStats
+
+    This class counts the traced calls for one prop of one class
+    """
+
+    __slots__ = ('gets', 'sets', 'confirms', 'confirm_time', 'failures')
+
+    def __init__(self):
+        self.gets = 0
+        self.sets = 0
+        self.confirms = 0
+        self.confirm_time = 0.
+        self.failures = 0
+
+    def __repr__(self):
+        return (
+            '<PropStats gets={} sets={} confirms={} confirm_time={:.6f} '
+            'failures={}>'.format(self.gets, self.sets, self.confirms,
+                                  self.confirm_time, self.failures)
+        )
+
+
+_GENERIC_INIT = WithSpecialProps.__init__
+_STATS = {}
+_HISTOGRAMS = {}
+_FAILURES = RingBuffer(4096)
+_TRACED = {}
+_INSTRUMENTED = {}
+_MEMOS = []
+_ACTIVE = {}
+
+
+def _stats(cls, name):
+    key = (_REGISTRY.qualified_name(cls), name)
+    stats = _STATS.get(key)
+    if stats is None:
+        stats = _STATS.setdefault(key, PropStats())
+    return stats
+
+
+def _histogram(cls, kind, name):
+    key = (kind, _REGISTRY.qualified_name(cls), name)
+    histogram = _HISTOGRAMS.get(key)
+    if histogram is None:
+        histogram = _HISTOGRAMS.setdefault(key, Histogram())
+    return histogram
+
+
+def _memo(lookup, *args):
+    """ This function returns a function of a class that memoizes
+    lookup(cls, *args) in a dict keyed by the class object, so
+    recording a sample neither formats names nor builds keys. reset
+    clears every memo.
+    """
+    memo = {}
+    _MEMOS.append(memo)
+
+    def get(cls):
+        value = memo.get(cls)
+        if value is None:
+            value = memo[cls] = lookup(cls, *args)
+        return value
+    return get
+
+
+def _timed(func, kind, name):
+    """ This function wraps the method func to record its latency in
+    the histogram (kind, class of self, name). Only the outermost call
+    on an instance is timed, so an __init__ or method that reaches
+    other wrapped versions of itself through super() counts once.
+    """
+    histogram = _memo(_histogram, kind, name)
+    active = _ACTIVE.setdefault((kind, name), threading.local())
+
+    @wraps(func)
+    def timed(self, *args, **kwargs):
+        outer = getattr(active, 'instance', None)
+        if outer is self:
+            return func(self, *args, **kwargs)
+        active.instance = self
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            active.instance = outer
+            histogram(self.__class__).record(elapsed)
+    return timed
+
+
+def _timed_confirm(confirm, prop, cls, stats, histogram, name, value):
+    stats.confirms += 1
+    start = time.perf_counter()
+    try:
+        return confirm(prop, value)
+    except ValueError as error:
+        stats.failures += 1
+        _FAILURES.record((
+            time.time(), _REGISTRY.qualified_name(cls), name, value, error
+        ))
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.confirm_time += elapsed
+        histogram.record(elapsed)
+
+
+def _instrumented(prop_class, name, owner):
+    """ This function returns a subclass of prop_class, the class of
+    the prop name declared on owner, whose __get__, __set__ and confirm
+    are counted and timed
+    """
+    key = (prop_class, name, owner)
+    if key in _INSTRUMENTED:
+        return _INSTRUMENTED[key]
+    generic = getattr(prop_class, '_generic', prop_class)
+    confirm = generic.confirm
+    stats = _memo(_stats, name)
+    histogram = _memo(_histogram, 'confirm', name)
+
+    def __get__(self, instance, cls):
+        if instance is None:
+            return self
+        stats(instance.__class__).gets += 1
+        try:
+            return getattr(instance, self.secret_name)
+        except AttributeError:
+            pass
+        raise ValueError('{}: property not set'.format(name))
+
+    def __set__(self, instance, value):
+        cls = instance.__class__
+        cls_stats = stats(cls)
+        cls_stats.sets += 1
+        value = _timed_confirm(
+            confirm, self, cls, cls_stats, histogram(cls), name, value
+        )
+        setattr(instance, self.secret_name, value)
+        cache = getattr(instance, '_cache', None)
+        if cache:
+            for dep in self._dependents:
+                cache.pop(dep, None)
+
+    def traced_confirm(self, value):
+        return _timed_confirm(
+            confirm, self, owner, stats(owner), histogram(owner), name, value
+        )
+
+    _INSTRUMENTED[key] = type(prop_class.__name__, (prop_class,), {
+        '__doc__': prop_class.__doc__,
+        '__get__': __get__,
+        '__set__': __set__,
+        'confirm': traced_confirm,
+        '_generic': generic,
+    })
+    return _INSTRUMENTED[key]
+
+
+def _swap(klass, saved, name, method):
+    saved.setdefault(name, klass.__dict__[name])
+    type.__setattr__(klass, name, method)
+
+
+def enable(classes=None, props=True,
+           methods=('summarize', 'time_per_slide', 'strains_eyes')):
+    """ This function instruments classes, or every class in
+    _REGISTRY, and their bases. Each __init__, and each of methods a
+    class defines, records its latency in a histogram.
+
+    If props, each prop is also swapped onto a subclass of its own
+    class that counts __get__ and __set__, times confirm into a
+    histogram and records validation failures. Generated __init__ and
+    update methods, which inline validation, are then replaced by the
+    generic ones, so __init__ latencies include the tracing.
+
+    Classes created after enable are not traced.
+    """
+    if classes is None:
+        classes = list(_REGISTRY.values())
+    for cls in classes:
+        _finalize(cls)
+        for klass in cls.__mro__:
+            if klass in _TRACED or '_props' not in klass.__dict__:
+                continue
+            saved = {}
+            init = klass.__dict__.get('__init__')
+            if init is not None:
+                if props and getattr(init, '_generated', False):
+                    init = _GENERIC_INIT
+                _swap(klass, saved, '__init__', _timed(init, 'init', None))
+            update = klass.__dict__.get('update')
+            if props and getattr(update, '_generated', False):
+                _swap(klass, saved, 'update', WithSpecialProps.update)
+            for name in methods:
+                if name in klass.__dict__:
+                    _swap(klass, saved, name, _timed(
+                        klass.__dict__[name], 'method', name
+                    ))
+            swapped = []
+            for name, prop in klass._props.items():
+                if props and klass.__dict__.get(name) is prop:
+                    swapped.append((prop, prop.__class__))
+                    prop.__class__ = _instrumented(
+                        prop.__class__, name, klass
+                    )
+            _TRACED[klass] = saved, swapped
+
+
+def disable():
+    """ This function restores every instrumented class and prop to
+    its original, untraced state
+    """
+    for klass, (saved, props) in _TRACED.items():
+        for name, method in saved.items():
+            type.__setattr__(klass, name, method)
+        for prop, prop_class in props:
+            prop.__class__ = prop_class
+    _TRACED.clear()
+    _INSTRUMENTED.clear()
+    del _MEMOS[:]
+
+
+def reset(size=4096):
+    """ This function clears the collected stats and starts a new
+    failure buffer of the given size
+    """
+    global _FAILURES
+    _STATS.clear()
+    _HISTOGRAMS.clear()
+    for memo in _MEMOS:
+        memo.clear()
+    _FAILURES = RingBuffer(size)
+
+
+def stats():
+    """ This function returns the collected PropStats keyed by
+    (qualified class name, prop name)
+    """
+    return dict(_STATS)
+
+
+def failures():
+    """ This function returns the most recent validation failures,
+    oldest first, as (time, qualified class name, prop name, value,
+    error)
+    """
+    return _FAILURES.items()
+
+
+def report_lines(limit=None):
+    """ This function yields one line per traced prop, the most costly
+    to validate first
+    """
+    rows = sorted(
+        _STATS.items(), key=lambda item: item[1].confirm_time, reverse=True
+    )
+    yield '{:<40} {:>10} {:>10} {:>10} {:>12} {:>9}'.format(
+        'class.prop', 'gets', 'sets', 'confirms', 'confirm (s)', 'failures'
+    )
+    for (cls, name), stats in rows[:limit]:
+        yield '{:<40} {:>10} {:>10} {:>10} {:>12.6f} {:>9}'.format(
+            '{}.{}'.format(cls, name), stats.gets, stats.sets,
+            stats.confirms, stats.confirm_time, stats.failures
+        )
+
+
+def snapshot():
+    """ This function returns a snapshot of every latency histogram,
+    keyed by (kind, qualified class name, name). kind is 'init',
+    'confirm' or 'method'; name is None for 'init', else the prop or
+    method name.
+    """
+    return dict(
+        (key, histogram.snapshot()) for key, histogram in _HISTOGRAMS.items()
+    )
+
+
+_METRICS = dict(
+    init=('pyyyc_init_seconds', 'WithSpecialProps __init__ latency', None),
+    confirm=('pyyyc_confirm_seconds', 'SpecialProp confirm latency',
+             'prop'),
+    method=('pyyyc_method_seconds', 'Method latency', 'method'),
+)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+# The last bucket of each power of two, whose bound is the next power
+# of two, except the last, which also holds anything longer
+_EXPORTED = range((1 << _SUB_BITS) - 1, _NBUCKETS - 1, 1 << _SUB_BITS)
+
+
+def prometheus_lines():
+    """ This function yields the latency histograms in the Prometheus
+    text exposition format. Every histogram has the same buckets, one
+    per power of two from 8ns, so each export has the same series.
+    """
+    for kind, (metric, text, label) in sorted(_METRICS.items()):
+        keys = sorted(key for key in _HISTOGRAMS if key[0] == kind)
+        if not keys:
+            continue
+        yield '# HELP {} {}'.format(metric, text)
+        yield '# TYPE {} histogram'.format(metric)
+        for key in keys:
+            histogram = _HISTOGRAMS[key]
+            labels = 'class="{}"'.format(_escape(key[1]))
+            if label is not None:
+                labels += ',{}="{}"'.format(label, _escape(key[2]))
+            counts = histogram.counts
+            cumulative = start = 0
+            for index in _EXPORTED:
+                cumulative += sum(counts[start:index + 1])
+                start = index + 1
+                yield '{}_bucket{{{},le="{:.9g}"}} {}'.format(
+                    metric, labels, _bucket_bound(index), cumulative
+                )
+            yield '{}_bucket{{{},le="+Inf"}} {}'.format(
+                metric, labels, histogram.count
+            )
+            yield '{}_sum{{{}}} {:.9g}'.format(metric, labels, histogram.total)
+            yield '{}_count{{{}}} {}'.format(metric, labels, histogram.count)
+
+
+def write_prometheus(path):
+    """ This function writes the latency histograms to path in the
+    Prometheus text exposition format. The file is replaced in one
+    step, so a collector never reads it half written.
+    """
+    temp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp, 'w') as stream:
+        for line in prometheus_lines():
+            stream.write(line + '\n')
+    os.replace(temp, path)
@@ -3,11 +3,33 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import re
+import threading
+from functools import wraps
+from itertools import chain
+from itertools import islice
+
 from builtins import super
+from collections import OrderedDict
+from copy import copy
+from types import MemberDescriptorType
+from weakref import WeakKeyDictionary
+from weakref import WeakSet
+from weakref import WeakValueDictionary
 from six import string_types
 from six import with_metaclass
 
 
+def _as_list(values):
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return list(values)
+
+
+def _dtype_kind(values):
+    return getattr(getattr(values, 'dtype', None), 'kind', None)
+
+
 class SpecialProp(object):
     """ class SpcecialProp
 
@@ -16,11 +38,17 @@ class SpecialProp(object):
     """
 
     secret_name = None
+    _dependents = ()
 
-    def __init__(self, doc):
+    def __init__(self, doc, default=None):
         self.doc = doc
+        if default is not None:
+            default = self.confirm(default)
+        self.default = default
 
     def __get__(self, instance, owner):
+        if instance is None:
+            return self
         if self.secret_name is None:
             raise ValueError('secret_name not set!')
         if not hasattr(instance, self.secret_name):
@@ -34,6 +62,10 @@ class SpecialProp(object):
             raise ValueError('secret_name not set!')
         value = self.confirm(value)
         setattr(instance, self.secret_name, value)
+        cache = getattr(instance, '_cache', None)
+        if cache is not None:
+            for dep in self._dependents:
+                cache.pop(dep, None)
 
     def confirm(self, value):
         """ This function validates value. It is overwritten by different
@@ -41,15 +73,224 @@ class SpecialProp(object):
         """
         return value
 
+    def confirm_source(self, var):
+        """ This function returns source lines that validate the variable
+        named var in place. SpecialProp subclasses that return None here
+        have confirm called instead.
+        """
+        return None
+
+    def check_source(self, var):
+        """ This function returns a source expression that is true if the
+        variable named var is valid as it is, or None. Values that fail
+        the check are passed to coerce.
+        """
+        return None
+
+    def coerce(self, value):
+        """ This function returns value validated like confirm, or
+        _MISSING if it is invalid, without raising
+        """
+        try:
+            return self.confirm(value)
+        except ValueError:
+            return _MISSING
+
+    def confirm_batch(self, values):
+        """ This function validates a whole column of values. It returns
+        the coerced values and a bytearray flagging invalid rows with 1,
+        rather than raising on the first bad value.
+        """
+        values = _as_list(values)
+        coerced = list(values)
+        errors = bytearray(len(values))
+        confirm = self.confirm
+        for i, value in enumerate(values):
+            try:
+                coerced[i] = confirm(value)
+            except ValueError:
+                errors[i] = 1
+        return coerced, errors
+
+
+# CSS/X11 color names; green keeps its original meaning here,
+# [0, 255, 0], rather than the CSS value 008000
+COLORS_NAMED = dict(
+    aliceblue='F0F8FF', antiquewhite='FAEBD7', aqua='00FFFF',
+    aquamarine='7FFFD4', azure='F0FFFF', beige='F5F5DC',
+    bisque='FFE4C4', black='000000', blanchedalmond='FFEBCD',
+    blue='0000FF', blueviolet='8A2BE2', brown='A52A2A',
+    burlywood='DEB887', cadetblue='5F9EA0', chartreuse='7FFF00',
+    chocolate='D2691E', coral='FF7F50', cornflowerblue='6495ED',
+    cornsilk='FFF8DC', crimson='DC143C', cyan='00FFFF',
+    darkblue='00008B', darkcyan='008B8B', darkgoldenrod='B8860B',
+    darkgray='A9A9A9', darkgrey='A9A9A9', darkgreen='006400',
+    darkkhaki='BDB76B', darkmagenta='8B008B', darkolivegreen='556B2F',
+    darkorange='FF8C00', darkorchid='9932CC', darkred='8B0000',
+    darksalmon='E9967A', darkseagreen='8FBC8F', darkslateblue='483D8B',
+    darkslategray='2F4F4F', darkslategrey='2F4F4F', darkturquoise='00CED1',
+    darkviolet='9400D3', deeppink='FF1493', deepskyblue='00BFFF',
+    dimgray='696969', dimgrey='696969', dodgerblue='1E90FF',
+    firebrick='B22222', floralwhite='FFFAF0', forestgreen='228B22',
+    fuchsia='FF00FF', gainsboro='DCDCDC', ghostwhite='F8F8FF',
+    gold='FFD700', goldenrod='DAA520', gray='808080',
+    grey='808080', green='00FF00', greenyellow='ADFF2F',
+    honeydew='F0FFF0', hotpink='FF69B4', indianred='CD5C5C',
+    indigo='4B0082', ivory='FFFFF0', khaki='F0E68C',
+    lavender='E6E6FA', lavenderblush='FFF0F5', lawngreen='7CFC00',
+    lemonchiffon='FFFACD', lightblue='ADD8E6', lightcoral='F08080',
+    lightcyan='E0FFFF', lightgoldenrodyellow='FAFAD2', lightgray='D3D3D3',
+    lightgrey='D3D3D3', lightgreen='90EE90', lightpink='FFB6C1',
+    lightsalmon='FFA07A', lightseagreen='20B2AA', lightskyblue='87CEFA',
+    lightslategray='778899', lightslategrey='778899', lightsteelblue='B0C4DE',
+    lightyellow='FFFFE0', lime='00FF00', limegreen='32CD32',
+    linen='FAF0E6', magenta='FF00FF', maroon='800000',
+    mediumaquamarine='66CDAA', mediumblue='0000CD', mediumorchid='BA55D3',
+    mediumpurple='9370DB', mediumseagreen='3CB371', mediumslateblue='7B68EE',
+    mediumspringgreen='00FA9A', mediumturquoise='48D1CC',
+    mediumvioletred='C71585', midnightblue='191970', mintcream='F5FFFA',
+    mistyrose='FFE4E1', moccasin='FFE4B5', navajowhite='FFDEAD',
+    navy='000080', oldlace='FDF5E6', olive='808000',
+    olivedrab='6B8E23', orange='FFA500', orangered='FF4500',
+    orchid='DA70D6', palegoldenrod='EEE8AA', palegreen='98FB98',
+    paleturquoise='AFEEEE', palevioletred='DB7093', papayawhip='FFEFD5',
+    peachpuff='FFDAB9', peru='CD853F', pink='FFC0CB',
+    plum='DDA0DD', powderblue='B0E0E6', purple='800080',
+    rebeccapurple='663399', red='FF0000', rosybrown='BC8F8F',
+    royalblue='4169E1', saddlebrown='8B4513', salmon='FA8072',
+    sandybrown='F4A460', seagreen='2E8B57', seashell='FFF5EE',
+    sienna='A0522D', silver='C0C0C0', skyblue='87CEEB',
+    slateblue='6A5ACD', slategray='708090', slategrey='708090',
+    snow='FFFAFA', springgreen='00FF7F', steelblue='4682B4',
+    tan='D2B48C', teal='008080', thistle='D8BFD8',
+    tomato='FF6347', turquoise='40E0D0', violet='EE82EE',
+    wheat='F5DEB3', white='FFFFFF', whitesmoke='F5F5F5',
+    yellow='FFFF00', yellowgreen='9ACD32'
+)
+
+_HEX_COLOR = re.compile(r'#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})\Z')
+_COLOR_CACHE_SIZE = 65536
+_LUMINANCE = {}
+
+
+class Color(tuple):
+    """ class Color
+
+    This class is an immutable (r, g, b) tuple with empty __slots__.
+    It compares equal to, and hashes like, the plain tuple, and also
+    compares equal to the [r, g, b] list it replaces. Use _color to
+    build them, so equal colors share one instance.
+    """
+
+    __slots__ = ()
+
+    r = property(lambda self: self[0])
+    g = property(lambda self: self[1])
+    b = property(lambda self: self[2])
+
+    @property
+    def packed(self):
+        """The color as a 24-bit int, 0xRRGGBB"""
+        r, g, b = self
+        return (r << 16) | (g << 8) | b
+
+    @property
+    def luminance(self):
+        """Relative luminance, 0-255, cached per color"""
+        luminance = _LUMINANCE.get(self)
+        if luminance is None:
+            r, g, b = self
+            luminance = 0.2126*r + 0.7152*g + 0.0722*b
+            if len(_LUMINANCE) < _COLOR_CACHE_SIZE:
+                _LUMINANCE[self] = luminance
+        return luminance
+
+    @property
+    def strains_eyes(self):
+        """True if one channel is above 200 and another below 50"""
+        r, g, b = self
+        return (r > 200 or g > 200 or b > 200) and (r < 50 or g < 50 or b < 50)
+
+    def __eq__(self, other):
+        if other.__class__ is list:
+            return len(other) == 3 and tuple.__eq__(self, tuple(other))
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        return 'Color({}, {}, {})'.format(*self)
+
+    def __str__(self):
+        return '[{}, {}, {}]'.format(*self)
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __reduce__(self):
+        return _color, (self.packed,)
+
+
+_COLORS_INTERNED = {}
+
+
+def _color(packed):
+    """ This function returns the shared Color for a packed rgb int """
+    color = _COLORS_INTERNED.get(packed)
+    if color is None:
+        color = tuple.__new__(Color, (packed >> 16, (packed >> 8) & 255,
+                                      packed & 255))
+        if len(_COLORS_INTERNED) < _COLOR_CACHE_SIZE:
+            _COLORS_INTERNED[packed] = color
+    return color
+
+
+def _parse_color(value):
+    """ This function converts a color name or #rgb/#rrggbb hex string
+    to a Color, or returns None if it is neither
+    """
+    text = COLORS_NAMED.get(value.lower())
+    if text is None:
+        match = _HEX_COLOR.match(value)
+        if match is None:
+            return None
+        text = match.group(1)
+        if len(text) == 3:
+            text = ''.join(c*2 for c in text)
+    return _color(int(text, 16))
+
+
+_COLOR_CACHE = dict((name, _parse_color(name)) for name in COLORS_NAMED)
+
 
 class ColorProp(SpecialProp):
     def confirm(self, value):
-        if value == 'red':
-            value = [255, 0, 0]
-        if value == 'green':
-            value = [0, 255, 0]
-        if value == 'blue':
-            value = [0, 0, 255]
+        if value.__class__ is Color:
+            return value
+        if value.__class__ is list and len(value) == 3:
+            # Fast path for the common [r, g, b] list of ints; the
+            # channels are all 0-255 if none has bits above the 8th,
+            # which also rules out negatives
+            r, g, b = value
+            if (int is r.__class__ is g.__class__ is b.__class__ and
+                    not (r | g | b) >> 8):
+                color = _COLORS_INTERNED.get((r << 16) | (g << 8) | b)
+                if color is not None:
+                    return color
+                return _color((r << 16) | (g << 8) | b)
+        if isinstance(value, string_types):
+            color = _COLOR_CACHE.get(value)
+            if color is None:
+                color = _parse_color(value)
+                if color is None:
+                    raise ValueError('{}: must be rgb color'.format(value))
+                if len(_COLOR_CACHE) < _COLOR_CACHE_SIZE:
+                    _COLOR_CACHE[value] = color
+            return color
         if not isinstance(value, (list, tuple)) or not len(value) == 3:
             raise ValueError('{}: must be rgb color'.format(value))
         for v in value:
@@ -57,7 +298,62 @@ class ColorProp(SpecialProp):
                 raise ValueError('{}: rgb must be ints'.format(value))
             if not 0 <= v < 256:
                 raise ValueError('{}: rgb must be 0-255'.format(value))
-        return value
+        return _color((value[0] << 16) | (value[1] << 8) | value[2])
+
+    def confirm_batch(self, values):
+        if (_dtype_kind(values) in ('i', 'u') and values.ndim == 2 and
+                values.shape[1] == 3):
+            errors = ((values < 0) | (values > 255)).any(axis=1)
+            rows = values.astype('i8')
+            packed = (rows[:, 0] << 16) | (rows[:, 1] << 8) | rows[:, 2]
+            # Only intern valid colors; invalid rows keep their values,
+            # as in the list path
+            coerced = [
+                _MISSING if error else _color(p)
+                for p, error in zip(packed.tolist(), errors.tolist())
+            ]
+            for i in errors.nonzero()[0].tolist():
+                coerced[i] = values[i].tolist()
+            return coerced, bytearray(errors.tolist())
+        values = _as_list(values)
+        coerced = list(values)
+        errors = bytearray(len(values))
+        coerce = self.coerce
+        for i, value in enumerate(values):
+            if value.__class__ in (list, tuple) and len(value) == 3:
+                r, g, b = value
+                if (int is r.__class__ is g.__class__ is b.__class__ and
+                        0 <= r < 256 and 0 <= g < 256 and 0 <= b < 256):
+                    coerced[i] = _color((r << 16) | (g << 8) | b)
+                    continue
+            color = coerce(value)
+            if color is _MISSING:
+                errors[i] = 1
+            else:
+                coerced[i] = color
+        return coerced, errors
+
+    def check_source(self, var):
+        return '{v}.__class__ is Color'.format(v=var)
+
+    def coerce(self, value):
+        # The same checks as confirm, returning _MISSING instead of
+        # raising
+        if value.__class__ is Color:
+            return value
+        if isinstance(value, (list, tuple)) and len(value) == 3:
+            r, g, b = value
+            if (isinstance(r, int) and isinstance(g, int) and
+                    isinstance(b, int) and
+                    0 <= r < 256 and 0 <= g < 256 and 0 <= b < 256):
+                return _color((r << 16) | (g << 8) | b)
+        elif isinstance(value, string_types):
+            color = _COLOR_CACHE.get(value)
+            if color is None:
+                color = _parse_color(value)
+            if color is not None:
+                return color
+        return _MISSING
 
 
 class FloatProp(SpecialProp):
@@ -66,6 +362,28 @@ class FloatProp(SpecialProp):
             raise ValueError('{}: must be float'.format(value))
         return value
 
+    def confirm_source(self, var):
+        return [
+            'if not isinstance({v}, float):'.format(v=var),
+            "    raise ValueError('{{}}: must be float'.format({v}))".format(
+                v=var
+            ),
+        ]
+
+    def check_source(self, var):
+        return 'isinstance({v}, float)'.format(v=var)
+
+    def coerce(self, value):
+        return value if isinstance(value, float) else _MISSING
+
+    def confirm_batch(self, values):
+        if _dtype_kind(values) == 'f':
+            return values.tolist(), bytearray(len(values))
+        values = _as_list(values)
+        return values, bytearray(
+            not isinstance(value, float) for value in values
+        )
+
 
 class IntProp(SpecialProp):
     def confirm(self, value):
@@ -73,6 +391,28 @@ class IntProp(SpecialProp):
             raise ValueError('{}: must be int'.format(value))
         return value
 
+    def confirm_source(self, var):
+        return [
+            'if not isinstance({v}, int):'.format(v=var),
+            "    raise ValueError('{{}}: must be int'.format({v}))".format(
+                v=var
+            ),
+        ]
+
+    def check_source(self, var):
+        return 'isinstance({v}, int)'.format(v=var)
+
+    def coerce(self, value):
+        return value if isinstance(value, int) else _MISSING
+
+    def confirm_batch(self, values):
+        if _dtype_kind(values) in ('b', 'i', 'u'):
+            return values.tolist(), bytearray(len(values))
+        values = _as_list(values)
+        return values, bytearray(
+            not isinstance(value, int) for value in values
+        )
+
 
 class StrProp(SpecialProp):
     def confirm(self, value):
@@ -80,8 +420,721 @@ class StrProp(SpecialProp):
             raise ValueError('{}: must be string'.format(value))
         return value
 
+    def confirm_source(self, var):
+        return [
+            'if not isinstance({v}, string_types):'.format(v=var),
+            "    raise ValueError('{{}}: must be string'.format({v}))".format(
+                v=var
+            ),
+        ]
+
+    def check_source(self, var):
+        return 'isinstance({v}, string_types)'.format(v=var)
+
+    def coerce(self, value):
+        return value if isinstance(value, string_types) else _MISSING
+
+    def confirm_batch(self, values):
+        if _dtype_kind(values) == 'U':
+            return values.tolist(), bytearray(len(values))
+        values = _as_list(values)
+        return values, bytearray(
+            not isinstance(value, string_types) for value in values
+        )
+
+
+class ClassRegistry(object):
+    """ class ClassRegistry
+
+    This class maps qualified class names (module.qualname) to
+    WithSpecialProps classes. It only holds weak references, so
+    dynamically created classes can be garbage collected, and keeps
+    secondary indexes from bare class name, prop name and prop type to
+    classes, and from a class to all its subclasses. Registering a
+    class under a name that is already taken replaces the old entry.
+    """
+
+    def __init__(self):
+        self._classes = WeakValueDictionary()
+        self._names = {}
+        self._props = {}
+        self._prop_types = {}
+        self._subclasses = WeakKeyDictionary()
+
+    @staticmethod
+    def qualified_name(cls):
+        return '{}.{}'.format(
+            cls.__module__, getattr(cls, '__qualname__', cls.__name__)
+        )
+
+    def register(self, cls):
+        name = self.qualified_name(cls)
+        old = self._classes.get(name)
+        if old is not None and old is not cls:
+            self._unindex(old)
+        self._classes[name] = cls
+        self._names.setdefault(cls.__name__, WeakSet()).add(cls)
+        for name, prop in cls._props.items():
+            self._props.setdefault(name, WeakSet()).add(cls)
+            for prop_type in type(prop).__mro__:
+                if issubclass(prop_type, SpecialProp):
+                    self._prop_types.setdefault(prop_type, WeakSet()).add(cls)
+        for base in cls.__mro__[1:]:
+            if base in self._subclasses:
+                self._subclasses[base].add(cls)
+        self._subclasses[cls] = WeakSet()
+
+    def _unindex(self, cls):
+        """Remove a replaced class from the secondary indexes"""
+        for index in (self._names, self._props, self._prop_types):
+            for key, classes in list(index.items()):
+                classes.discard(cls)
+                if not classes:
+                    del index[key]
+        self._subclasses.pop(cls, None)
+        for subclasses in self._subclasses.values():
+            subclasses.discard(cls)
+
+    def __getitem__(self, name):
+        """Look up a class by qualified name, or by bare name if that is
+        unambiguous"""
+        if name in self._classes:
+            return self._classes[name]
+        classes = self.named(name)
+        if len(classes) == 1:
+            return next(iter(classes))
+        if classes:
+            raise KeyError('Ambiguous class name: {}'.format(name))
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(list(self._classes))
+
+    def __len__(self):
+        return len(self._classes)
+
+    def __repr__(self):
+        return repr(dict(self._classes))
+
+    def keys(self):
+        return list(self._classes)
+
+    def values(self):
+        return list(self._classes.values())
+
+    def items(self):
+        return list(self._classes.items())
+
+    def named(self, name):
+        """Classes with the bare name"""
+        return frozenset(self._names.get(name, ()))
+
+    def with_prop(self, name):
+        """Classes that have a prop with the name"""
+        return frozenset(self._props.get(name, ()))
+
+    def with_prop_type(self, prop_type):
+        """Classes that have a prop of prop_type or a subclass of it"""
+        return frozenset(self._prop_types.get(prop_type, ()))
+
+    def subclasses_of(self, cls):
+        """Registered classes that inherit from cls"""
+        return frozenset(self._subclasses.get(cls, ()))
+
+
+class _Missing(object):
+    """ class _Missing
+
+    This class is the type of _MISSING, the marker for an unset prop.
+    It pickles by reference so the marker survives a round trip.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_MISSING'
+
+    def __repr__(self):
+        return '_MISSING'
+
+
+_REGISTRY = ClassRegistry()
+_MISSING = _Missing()
+_FINALIZE_LOCK = threading.RLock()
+
+
+def _compile(source, closure):
+    """ This function compiles source for a factory function named _make
+    and returns the result of calling it with the closure values
+    """
+    namespace = {}
+    exec(compile('\n'.join(source), '<SecretNameMeta>', 'exec'),
+         globals(), namespace)
+    return namespace['_make'](**closure)
+
+
+def _confirm_source(prop, name, var, closure):
+    """ This function returns the lines validating var for prop. It
+    falls back to calling confirm if the check cannot be inlined
+    """
+    lines = prop.confirm_source(var)
+    if lines is None:
+        closure['_confirm_' + name] = prop.confirm
+        lines = ['{v} = _confirm_{name}({v})'.format(v=var, name=name)]
+    return lines
+
+
+def _indent(lines, depth):
+    return [' '*depth + line for line in lines]
+
+
+def _reject(kwargs, names):
+    for key in kwargs:
+        if key[:1] == '_':
+            raise KeyError('Cannot set private property: {}'.format(key))
+        if key not in names:
+            raise KeyError('Property is unavailable: {}'.format(key))
+
+
+def _specialize(props, dependents):
+    """ This function swaps each (name, prop) in props onto a subclass
+    of its own class with __get__ and __set__ generated for its
+    secret_name. Setting the value clears the cached results of the
+    dependents. All accessors are compiled together.
+    """
+    closure = {}
+    source = []
+    for i, (name, prop) in enumerate(props):
+        setter = _confirm_source(prop, name, 'value', closure)
+        setter += ['instance.{} = value'.format(prop.secret_name)]
+        if dependents.get(name):
+            setter += [
+                "cache = getattr(instance, '_cache', None)",
+                'if cache:',
+            ] + [
+                "    cache.pop('{}', None)".format(dep)
+                for dep in dependents[name]
+            ]
+        source += [
+            line.format(i=i, secret=prop.secret_name, name=name)
+            for line in [
+                '    def __get__(self, instance, owner):',
+                '        if instance is None:',
+                '            return self',
+                '        try:',
+                '            return instance.{secret}',
+                '        except AttributeError:',
+                '            pass',
+                "        raise ValueError('{name}: property not set')",
+                '    accessors.append(__get__)',
+                '    def __set__(self, instance, value):',
+            ]
+        ] + _indent(setter, 8) + ['    accessors.append(__set__)']
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    accessors = []',
+    ] + source + ['    return accessors']
+    accessors = _compile(source, closure)
+
+    for i, (name, prop) in enumerate(props):
+        generic = getattr(type(prop), '_generic', type(prop))
+        prop.__class__ = type(generic.__name__, (generic,), {
+            '__doc__': generic.__doc__,
+            '__get__': accessors[2*i],
+            '__set__': accessors[2*i + 1],
+            '_generic': generic,
+        })
+
+
+def _finalize(cls):
+    """ This function compiles the specialized accessors, __init__,
+    update, _from_values, validators, __eq__, __hash__ and
+    __reduce_ex__ of cls and its bases. SecretNameMeta defers this
+    until a class is first instantiated, so classes that are never used
+    never pay for code generation. Until then the generic SpecialProp
+    methods apply. Classes are finalized under a lock, and _pending is
+    only cleared once everything is installed, so other threads either
+    wait or see a fully finalized class.
+    """
+    if all(klass.__dict__.get('_pending') is None for klass in cls.__mro__):
+        return
+    with _FINALIZE_LOCK:
+        for klass in cls.__mro__:
+            pending = klass.__dict__.get('_pending')
+            if pending is not None:
+                _finalize_one(klass, *pending)
+                type.__setattr__(klass, '_pending', None)
+
+
+def _finalize_one(klass, props, generate_init, generate_eq):
+    """ This function generates and installs the methods of one class
+    for _finalize
+    """
+    _specialize(props, klass._derived)
+    if generate_init:
+        type.__setattr__(
+            klass, '__init__', _generate_init(klass, klass._props)
+        )
+    type.__setattr__(klass, '_from_values', staticmethod(
+        _generate_from_values(klass, klass._props)
+    ))
+    type.__setattr__(
+        klass, '_validators', _generate_validators(klass, klass._props)
+    )
+    if generate_eq:
+        for name, method in zip(
+                ['__eq__', '__ne__', '__hash__'],
+                _generate_eq(klass, klass._props)):
+            type.__setattr__(klass, name, method)
+    if (getattr(klass.__reduce__, '_generated',
+                klass.__reduce__ is object.__reduce__) and
+            getattr(klass.__reduce_ex__, '_generated',
+                    klass.__reduce_ex__ is object.__reduce_ex__)):
+        reduce = _generate_reduce(klass, klass._props)
+        type.__setattr__(klass, '__reduce__', reduce)
+        type.__setattr__(klass, '__reduce_ex__', reduce)
+    if 'update' not in klass.__dict__ and getattr(
+            klass.update, '_generated',
+            klass.update is WithSpecialProps.update):
+        type.__setattr__(
+            klass, 'update', _generate_update(klass, klass._props)
+        )
+
+
+def _first_init(cls):
+    """ This function returns an __init__ for cls that finalizes the
+    class on first use, then hands over to the generated __init__
+    """
+    def __init__(self, **kwargs):
+        _finalize(self.__class__)
+        return cls.__dict__['__init__'](self, **kwargs)
+    __init__.__doc__ = WithSpecialProps.__init__.__doc__
+    __init__._generated = True
+    return __init__
+
+
+class _PropsDoc(object):
+    """ class _PropsDoc
+
+    This class stands in for a class __doc__ and builds the Properties
+    section from the prop table the first time it is read
+    """
+
+    def __init__(self, doc, props):
+        self.doc = doc
+        self.props = props
+
+    def __get__(self, instance, owner):
+        if self.props is not None:
+            self.doc += '    \n\nProperties:\n' + ''.join(
+                '        {prop} - {doc}\n'.format(prop=prop, doc=value.doc)
+                for prop, value in self.props.items()
+            )
+            self.props = None
+        return self.doc
+
+
+def derived(*props):
+    """ This function decorates a method whose result depends only on
+    the named SpecialProps. SecretNameMeta caches the result on each
+    instance until one of those props is set.
+    """
+    def wrapper(func):
+        func._derived_from = props
+        return func
+    return wrapper
+
+
+def _cache_derived(func):
+    """ This function wraps a derived method to cache its result. The
+    cache is bound before computing, so a result computed from values
+    that update replaces meanwhile lands in the discarded cache rather
+    than the new one.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def cached(self):
+        try:
+            cache = self._cache
+            return cache[name]
+        except KeyError:
+            pass
+        except AttributeError:
+            cache = self._cache = {}
+        value = cache[name] = func(self)
+        return value
+    cached._derived_from = func._derived_from
+    return cached
+
+
+def _generate_init(cls, props):
+    """ This function generates an __init__ function for cls that sets
+    each SpecialProp from keyword arguments with validation inlined
+    """
+    closure = {'_cls': cls, '_names': frozenset(props)}
+    body = []
+    for name, prop in props.items():
+        body += [
+            "if '{}' in kwargs:".format(name),
+            "    value = kwargs['{}']".format(name),
+        ]
+        body += _indent(_confirm_source(prop, name, 'value', closure), 4)
+        body += ['    self.{} = value'.format(prop.secret_name)]
+        if prop.default is not None:
+            closure['_default_' + name] = prop.default
+            body += [
+                'else:',
+                '    self.{} = _default_{}'.format(prop.secret_name, name),
+            ]
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def __init__(self, **kwargs):',
+        '        if self.__class__ is not _cls:',
+        '            return WithSpecialProps.__init__(self, **kwargs)',
+        '        if not _names.issuperset(kwargs):',
+        '            _reject(kwargs, _names)',
+    ] + _indent(body, 8) + ['    return __init__']
+    init = _compile(source, closure)
+    init.__doc__ = WithSpecialProps.__init__.__doc__
+    init._generated = True
+    return init
+
+
+def _in_dict(cls):
+    """ This function returns True if instances of cls keep all their
+    prop values, and the derived cache, in __dict__ rather than slots
+    """
+    return bool(cls.__dictoffset__) and not any(
+        isinstance(getattr(cls, name, None), MemberDescriptorType)
+        for name in [prop.secret_name for prop in cls._props.values()] +
+        ['_cache']
+    )
 
-_REGISTRY = {}
+
+def _commit(instance, values, stale, in_dict):
+    """ This function sets the validated values, keyed by secret name,
+    on instance and clears the derived results named in stale. If
+    in_dict, it all happens in a single __dict__ update, so other
+    threads see either none or all of the change.
+    """
+    cache = getattr(instance, '_cache', None)
+    if cache is not None and stale:
+        # Always swap in a new dict, even for an empty cache, so a
+        # reader still computing from the old values stores its result
+        # in the dict being replaced
+        values['_cache'] = dict(
+            (key, value) for key, value in cache.items() if key not in stale
+        )
+    if in_dict:
+        instance.__dict__.update(values)
+        return
+    for key, value in values.items():
+        object.__setattr__(instance, key, value)
+
+
+def _generate_update(cls, props):
+    """ This function generates an update method for cls that
+    validates every keyword argument, with validation inlined, before
+    committing them together
+    """
+    closure = {
+        '_cls': cls,
+        '_names': frozenset(props),
+        '_in_dict': _in_dict(cls),
+    }
+    body = ['values = {}', 'stale = ()']
+    for name, prop in props.items():
+        body += [
+            "if '{}' in kwargs:".format(name),
+            "    value = kwargs['{}']".format(name),
+        ]
+        body += _indent(_confirm_source(prop, name, 'value', closure), 4)
+        body += ["    values['{}'] = value".format(prop.secret_name)]
+        if prop._dependents:
+            body += ['    stale += {!r}'.format(tuple(
+                str(dep) for dep in prop._dependents
+            ))]
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def update(self, **kwargs):',
+        '        if self.__class__ is not _cls:',
+        '            return WithSpecialProps.update(self, **kwargs)',
+        '        if not _names.issuperset(kwargs):',
+        '            _reject(kwargs, _names)',
+    ] + _indent(body, 8) + [
+        '        _commit(self, values, stale, _in_dict)',
+        '    return update',
+    ]
+    update = _compile(source, closure)
+    update.__doc__ = WithSpecialProps.update.__doc__
+    update._generated = True
+    return update
+
+
+def _generate_validators(cls, props):
+    """ This function generates standalone validators for the props of
+    cls, one for keyword dictionaries and one for tuples of values in
+    _props order. Both return the coerced values as a tuple in _props
+    order, with defaults filled in and _MISSING for unset props, or
+    None if the input is invalid. They take an optional ErrorTable and
+    row index to record every error in; without one they return at the
+    first error. Nothing is raised for invalid values.
+    """
+    closure = {'_names': frozenset(props), '_nprops': len(props)}
+    args = ['value{}'.format(i) for i in range(len(props))]
+    checks = []
+    for arg, (name, prop) in zip(args, props.items()):
+        closure['_coerce_' + name] = prop.coerce
+        closure['_prop_' + name] = prop
+        check = prop.check_source(arg)
+        lines = [
+            'if {} is _MISSING:'.format(arg),
+            '    pass' if prop.default is None else
+            '    {} = _default_{}'.format(arg, name),
+            'elif not ({}):'.format(check) if check else 'else:',
+            '    bad = {}'.format(arg),
+            '    {} = _coerce_{}(bad)'.format(arg, name),
+            '    if {} is _MISSING:'.format(arg),
+            '        if errors is None:',
+            '            return None',
+            "        errors.add(row, '{0}', bad, _prop_{0})".format(name),
+            '        valid = False',
+        ]
+        if prop.default is not None:
+            closure['_default_' + name] = prop.default
+        checks += lines
+    values = '({})'.format(''.join(arg + ', ' for arg in args))
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def validate_dict(record, errors=None, row=0):',
+        '        valid = True',
+        '        if not _names.issuperset(record):',
+        '            if errors is None:',
+        '                return None',
+        '            for key in record:',
+        '                if key not in _names:',
+        '                    errors.add(row, key, record[key])',
+        '            valid = False',
+    ] + [
+        "        {} = record.get('{}', _MISSING)".format(arg, name)
+        for arg, name in zip(args, props)
+    ] + _indent(checks, 8) + [
+        '        return {} if valid else None'.format(values),
+        '    def validate_tuple(values, errors=None, row=0):',
+        '        if len(values) != _nprops:',
+        "            raise ValueError('{}: must have {} values'.format(",
+        '                values, _nprops',
+        '            ))',
+        '        valid = True',
+        '        {} = values'.format(''.join(arg + ', ' for arg in args))
+        if args else '        pass',
+    ] + _indent(checks, 8) + [
+        '        return {} if valid else None'.format(values),
+        '    return validate_dict, validate_tuple',
+    ]
+    return _compile(source, closure)
+
+
+def _generate_from_values(cls, props):
+    """ This function generates a trusted constructor for cls that sets
+    already validated values, given in _props order, without confirm.
+    Values that are _MISSING get the prop default, or are left unset.
+    """
+    closure = {'_cls': cls}
+    args = ['value{}'.format(i) for i in range(len(props))]
+    body = [
+        'self = _cls.__new__(_cls)',
+        '{}, = values'.format(', '.join(args)) if args else 'pass',
+    ]
+    for arg, (name, prop) in zip(args, props.items()):
+        body += [
+            'if {} is not _MISSING:'.format(arg),
+            '    self.{} = {}'.format(prop.secret_name, arg),
+        ]
+        if prop.default is not None:
+            closure['_default_' + name] = prop.default
+            body += [
+                'else:',
+                '    self.{} = _default_{}'.format(prop.secret_name, name),
+            ]
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def _from_values(values):',
+    ] + _indent(body, 8) + ['        return self', '    return _from_values']
+    return _compile(source, closure)
+
+
+def _slot_names(cls):
+    """ This function returns the names of the slots of instances of
+    cls, from cls and its bases, already mangled
+    """
+    return OrderedDict(
+        (name, None)
+        for klass in reversed(cls.__mro__)
+        for name, value in vars(klass).items()
+        if isinstance(value, MemberDescriptorType)
+    )
+
+
+def _rebuild(cls, *values):
+    """ This function reconstructs a pickled instance of cls from the
+    values stored by its generated __reduce__, without confirm
+    """
+    if cls._pending is not None:
+        _finalize(cls)
+    return cls._from_values(values)
+
+
+def _read_values(cls, props, obj):
+    """ This function returns setup lines and a list of expressions
+    reading the values of props from obj, an instance of cls, with
+    _MISSING for unset props
+    """
+    if _in_dict(cls):
+        return ['{o}_state = {o}.__dict__'.format(o=obj)], [
+            "{}_state.get('{}', _MISSING)".format(obj, prop.secret_name)
+            for prop in props.values()
+        ]
+    return [], [
+        "getattr({}, '{}', _MISSING)".format(obj, prop.secret_name)
+        for prop in props.values()
+    ]
+
+
+def _generate_eq(cls, props):
+    """ This function generates __eq__, __ne__ and __hash__ for cls
+    that compare the values of props. Instances of different classes
+    are never equal. The hash is kept in the derived cache, which the
+    setters of every prop clear.
+    """
+    closure = {'_cls': cls}
+    setup, mine = _read_values(cls, props, 'self')
+    other_setup, theirs = _read_values(cls, props, 'other')
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def __eq__(self, other):',
+        '        if other.__class__ is not self.__class__:',
+        '            return NotImplemented',
+        '        if other is self:',
+        '            return True',
+    ] + _indent(setup + other_setup, 8) + [
+        # Tuple comparison skips __eq__ for identical values, such as
+        # interned Colors
+        '        return ({}) == ({})'.format(
+            ''.join(expr + ', ' for expr in mine),
+            ''.join(expr + ', ' for expr in theirs),
+        ),
+        '    def __ne__(self, other):',
+        '        equal = __eq__(self, other)',
+        '        return equal if equal is NotImplemented else not equal',
+        '    def __hash__(self):',
+        "        cache = getattr(self, '_cache', None)",
+        '        if cache is None:',
+        '            cache = self._cache = {}',
+        "        value = cache.get('__hash__')",
+        '        if value is None:',
+    ] + _indent(setup, 12) + [
+        "            value = cache['__hash__'] = hash((_cls, {}))".format(
+            ''.join(expr + ', ' for expr in mine)
+        ),
+        '        return value',
+        '    return __eq__, __ne__, __hash__',
+    ]
+    methods = _compile(source, closure)
+    for method in methods:
+        method._generated = True
+    return methods
+
+
+def _generate_reduce(cls, props):
+    """ This function generates a __reduce_ex__ for cls, also used as
+    its __reduce__, that pickles the prop values as a tuple in _props
+    order, with _MISSING for unset props, to be rebuilt by _rebuild.
+    The values go straight into the reduce arguments, so pickling
+    allocates one tuple per instance. Any other instance attributes
+    are pickled as state.
+    """
+    closure = {
+        '_cls': cls,
+        '_skip': frozenset(
+            [prop.secret_name for prop in props.values()] + ['_cache']
+        ),
+    }
+    args = ['value{}'.format(i) for i in range(len(props))]
+    pack = 'args = (_cls, {})'.format(', '.join(args))
+    if _in_dict(cls):
+        body = ['state = self.__dict__']
+        body += [
+            "{} = state.get('{}', _MISSING)".format(arg, prop.secret_name)
+            for arg, prop in zip(args, props.values())
+        ]
+        # Only look for other attributes if __dict__ holds more than
+        # the set props
+        body += [
+            pack,
+            'if len(state) > {}:'.format(' + '.join(
+                '({} is not _MISSING)'.format(arg) for arg in args
+            ) or 0),
+            '    extra = state.keys() - _skip',
+            '    if extra:',
+            '        return _rebuild, args, dict(',
+            '            (key, state[key]) for key in extra',
+            '        )',
+        ]
+    else:
+        body = []
+        for arg, prop in zip(args, props.values()):
+            body += [
+                'try:',
+                '    {} = self.{}'.format(arg, prop.secret_name),
+                'except AttributeError:',
+                '    {} = _MISSING'.format(arg),
+            ]
+        body += [pack, 'state = None']
+        if cls.__dictoffset__:
+            body += [
+                'extra = self.__dict__.keys() - _skip',
+                'if extra:',
+                '    state = dict((key, self.__dict__[key]) for key in extra)',
+            ]
+        # Other slots are pickled as (state, slots), the same form as
+        # object.__reduce_ex__
+        closure['_slots'] = tuple(
+            name for name in _slot_names(cls) if name not in closure['_skip']
+        )
+        if closure['_slots']:
+            body += [
+                'slots = {}',
+                'for name in _slots:',
+                '    try:',
+                '        slots[name] = getattr(self, name)',
+                '    except AttributeError:',
+                '        pass',
+                'if slots:',
+                '    return _rebuild, args, (state, slots)',
+            ]
+        body += [
+            'if state:',
+            '    return _rebuild, args, state',
+        ]
+    source = [
+        'def _make({}):'.format(', '.join(closure)),
+        '    def __reduce_ex__(self, protocol=2):',
+    ] + _indent(body, 8) + [
+        '        return _rebuild, args',
+        '    return __reduce_ex__',
+    ]
+    reduce = _compile(source, closure)
+    reduce._generated = True
+    return reduce
 
 
 class SecretNameMeta(type):
@@ -89,37 +1142,188 @@ class SecretNameMeta(type):
 
     This metaclass manipulate its classes by creating a _props
     attribute that doesn't exist in the original definition and
-    setting the secret_name of all the SpecialProp attributes
+    setting the secret_name of all the SpecialProp attributes. _props
+    is an ordered mapping from name to SpecialProp, merged with the
+    _props of the base classes.
+
+    Classes that set _compact = True (or inherit from one that does)
+    also get __slots__ for the secret names, so their instances have
+    no __dict__.
+
+    Methods decorated with derived are cached, and the generated
+    setters of the props they depend on clear that cache.
+
+    Unless a class defines its own __eq__ or __hash__, its instances
+    compare equal when they have the same class and prop values, and
+    their hash is cached until a prop is set.
+
+    Instances pickle as a tuple of their prop values, which is rebuilt
+    without validation.
+
+    The accessors, __init__, __reduce__ and docstring are generated
+    lazily, when the class is first instantiated or its __doc__ first
+    read.
     """
 
     def __new__(mcs, name, bases, attrs):
-        _props = []
-        keys = [k for k in attrs]
-        for key in keys:
-            if isinstance(attrs[key], SpecialProp) and key == 'props':
-                raise ValueError('Cannot have a SpecialProp named \'props\'')
-            if isinstance(attrs[key], SpecialProp):
-                _props += [key]
-                attrs[key].secret_name = '_' + key
+        _props = OrderedDict()
+        _derived = {}
+        for base in reversed(bases):
+            _props.update(getattr(base, '_props', {}))
+            for prop, methods in getattr(base, '_derived', {}).items():
+                _derived[prop] = _derived.get(prop, ()) + tuple(
+                    m for m in methods if m not in _derived.get(prop, ())
+                )
 
-        attrs['_props'] = _props
+        own = OrderedDict()
+        derived_methods = []
+        for key, value in attrs.items():
+            if isinstance(value, SpecialProp):
+                if key == 'props':
+                    raise ValueError(
+                        'Cannot have a SpecialProp named \'props\''
+                    )
+                own[key] = _props[key] = value
+                value.secret_name = '_' + key
+            elif hasattr(value, '_derived_from'):
+                derived_methods += [key]
+
+        for key in derived_methods:
+            for prop in attrs[key]._derived_from:
+                if prop not in _props:
+                    raise ValueError('{}: derived from unknown property '
+                                     '{}'.format(key, prop))
+                if key not in _derived.get(prop, ()):
+                    _derived[prop] = _derived.get(prop, ()) + (key,)
+            attrs[key] = _cache_derived(attrs[key])
 
-        if '__doc__' not in attrs:
-            attrs['__doc__'] = ''
+        # Compare by value, and keep the hash in the derived cache,
+        # unless the class or a base defines its own __eq__ or __hash__
+        value_eq = (
+            '__eq__' not in attrs and '__hash__' not in attrs and all(
+                getattr(base.__eq__, '_generated',
+                        base.__eq__ is object.__eq__) and
+                getattr(base.__hash__, '_generated',
+                        base.__hash__ is object.__hash__)
+                for base in bases
+            )
+        )
+        if value_eq:
+            for prop in _props:
+                if '__hash__' not in _derived.get(prop, ()):
+                    _derived[prop] = _derived.get(prop, ()) + ('__hash__',)
 
-        attrs['__doc__'] += '    \n\nProperties:\n'
+        # Inherited props whose dependents changed need their own setter
         for prop in _props:
-            attrs['__doc__'] += '        {prop} - {doc}\n'.format(
-                prop=prop,
-                doc=attrs[prop].doc
+            if (prop not in own and
+                    _props[prop]._dependents != _derived.get(prop, ())):
+                own[prop] = _props[prop] = attrs[prop] = copy(_props[prop])
+        for prop in own:
+            own[prop]._dependents = _derived.get(prop, ())
+
+        attrs['_props'] = _props
+        attrs['_derived'] = _derived
+
+        if attrs.get(
+                '_compact', any(getattr(b, '_compact', False) for b in bases)
+        ):
+            slots = attrs.get('__slots__', ())
+            if isinstance(slots, string_types):
+                slots = (slots,)
+            attrs['__slots__'] = tuple(slots) + tuple(
+                _props[prop].secret_name for prop in own
+                if not any(hasattr(b, _props[prop].secret_name) for b in bases)
             )
+            if _derived and not any(hasattr(b, '_cache') for b in bases):
+                attrs['__slots__'] += ('_cache',)
+
+        attrs['__doc__'] = _PropsDoc(attrs.get('__doc__') or '', _props)
 
         new_class = super().__new__(mcs, name, bases, attrs)
-        _REGISTRY[name] = new_class
+        _REGISTRY.register(new_class)
+
+        # Generate __init__ unless the class or a base defines its own,
+        # the same check as for update
+        inherited = new_class.__init__
+        generate_init = '__init__' not in attrs and getattr(
+            inherited, '_generated', inherited is WithSpecialProps.__init__
+        )
+        new_class._pending = (list(own.items()), generate_init, value_eq)
+        if generate_init:
+            new_class.__init__ = _first_init(new_class)
 
         return new_class
 
 
+class ErrorTable(object):
+    """ class ErrorTable
+
+    This class collects the validation errors of a batch of records as
+    columns of record index, property name and rejected value. Nothing
+    is raised or formatted while errors are collected; the exception
+    and message for an error are only built when it is read.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.names = []
+        self.values = []
+        self._props = []
+
+    def add(self, row, name, value, prop=None):
+        """Record that value for name in record row failed prop, or was
+        an unknown or private keyword if prop is None"""
+        self.rows.append(row)
+        self.names.append(name)
+        self.values.append(value)
+        self._props.append(prop)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def error(self, index):
+        """Build the exception that strict validation raises for the
+        error at index"""
+        prop, name = self._props[index], self.names[index]
+        if prop is None:
+            if name[:1] == '_':
+                return KeyError('Cannot set private property: {}'.format(name))
+            return KeyError('Property is unavailable: {}'.format(name))
+        try:
+            prop.confirm(self.values[index])
+        except ValueError as error:
+            return error
+        return ValueError('{}: invalid'.format(self.values[index]))
+
+    def message(self, index):
+        """The message of the error at index"""
+        return self.error(index).args[0]
+
+    def __getitem__(self, index):
+        return self.rows[index], self.names[index], self.message(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def invalid_rows(self):
+        """Sorted indexes of the records that had errors"""
+        return sorted(set(self.rows))
+
+    def by_row(self):
+        """Map each invalid record index, in order, to the indexes of
+        its errors"""
+        rows = {}
+        for index, row in enumerate(self.rows):
+            rows.setdefault(row, []).append(index)
+        return OrderedDict((row, rows[row]) for row in sorted(rows))
+
+    def __repr__(self):
+        return '<ErrorTable: {} errors in {} records>'.format(
+            len(self), len(set(self.rows))
+        )
+
+
 class WithSpecialProps(with_metaclass(SecretNameMeta, object)):
     """ class WithSpecialProps
 
@@ -127,13 +1331,106 @@ class WithSpecialProps(with_metaclass(SecretNameMeta, object)):
     properties through keyword arguments
     """
 
+    __slots__ = ()
+    _compact = False
+
     def __init__(self, **kwargs):
+        """ Set SpecialProp properties from keyword arguments. Classes
+        created by SecretNameMeta replace this with a generated
+        equivalent specialized to their own properties.
+        """
+        _finalize(self.__class__)
         for key in kwargs:
             if key[0] == '_':
                 raise KeyError('Cannot set private property: {}'.format(key))
             if key not in self._props:
                 raise KeyError('Property is unavailable: {}'.format(key))
             setattr(self, key, kwargs[key])
+        for key, prop in self._props.items():
+            if key not in kwargs and prop.default is not None:
+                setattr(self, prop.secret_name, prop.default)
+
+    def update(self, **kwargs):
+        """ Set several SpecialProp properties from keyword arguments
+        at once. Every value is validated before any is set, so an
+        invalid value leaves the instance unchanged. Derived results
+        that depend on the new values are cleared once, together with
+        the change.
+        """
+        _finalize(self.__class__)
+        props = self._props
+        if not frozenset(props).issuperset(kwargs):
+            _reject(kwargs, props)
+        values = {}
+        stale = ()
+        for key, value in kwargs.items():
+            values[props[key].secret_name] = props[key].confirm(value)
+            stale += props[key]._dependents
+        _commit(self, values, stale, _in_dict(self.__class__))
+
+    @classmethod
+    def validator(cls, tuples=False):
+        """ Return a standalone function that validates a keyword
+        dictionary, or a tuple of values in _props order if tuples, as
+        this class would without constructing an instance. Called as
+        validate(record, errors=None, row=0), it returns the coerced
+        values in _props order, with defaults filled in and _MISSING
+        for unset props, or None if record is invalid. If errors is an
+        ErrorTable, every error is added to it as record row.
+        """
+        _finalize(cls)
+        return cls._validators[1 if tuples else 0]
+
+    @classmethod
+    def from_records(cls, records, strict=True, errors=None):
+        """ Construct instances from an iterable of keyword dictionaries.
+        Each property is validated for all records at once with
+        confirm_batch. If strict is False, invalid records are dropped
+        instead of raising. If errors is an ErrorTable, invalid records
+        are dropped and every error in them is added to it.
+        """
+        _finalize(cls)
+        strict = strict and errors is None
+        records = list(records)
+        names = frozenset(cls._props)
+        invalid = bytearray(len(records))
+        for i, record in enumerate(records):
+            if not names.issuperset(record):
+                if strict:
+                    _reject(record, names)
+                invalid[i] = 1
+                if errors is not None:
+                    for key in record:
+                        if key not in names:
+                            errors.add(i, key, record[key])
+        columns = []
+        for name, prop in cls._props.items():
+            try:
+                values = [record[name] for record in records]
+                index = range(len(records))
+            except KeyError:
+                index = [
+                    i for i, record in enumerate(records) if name in record
+                ]
+                values = [records[i][name] for i in index]
+            coerced, flags = prop.confirm_batch(values)
+            if strict and any(flags):
+                prop.confirm(values[flags.index(1)])
+            if len(index) == len(records) and not any(flags):
+                columns.append(coerced)
+                continue
+            column = [_MISSING]*len(records)
+            for i, value, flag in zip(index, coerced, flags):
+                if not flag:
+                    column[i] = value
+                    continue
+                invalid[i] = 1
+                if errors is not None:
+                    errors.add(i, name, records[i][name], prop)
+            columns.append(column)
+        rows = zip(*columns) if columns else [()]*len(records)
+        build = cls._from_values
+        return [build(row) for row, bad in zip(rows, invalid) if not bad]
 
 
 class PyYYCPresentation(WithSpecialProps):
@@ -150,23 +1447,29 @@ class PyYYCPresentation(WithSpecialProps):
     nslides = IntProp('Number of powerpoint slides')
     slide_color = ColorProp('RGB color of the slides')
 
+    def summary_lines(self):
+        """Generate a short description of the presentation"""
+        yield 'Pythonista {name} talking about {topic}.'.format(
+            name=self.presenter,
+            topic=self.topic
+        )
+
     def summarize(self):
         """Print a short description of the presentation. Useful for
         press junkets.
         """
-        print('Pythonista {name} talking about {topic}.'.format(
-            name=self.presenter,
-            topic=self.topic
-        ))
+        for line in self.summary_lines():
+            print(line)
 
+    @derived('time_limit', 'nslides')
     def time_per_slide(self):
         """Time available for each slide"""
         return self.time_limit / self.nslides
 
+    @derived('slide_color')
     def strains_eyes(self):
         """Determines if the slides will cause eye strain"""
-        return(any([rgb > 200 for rgb in self.slide_color]) and
-               any([rgb < 50 for rgb in self.slide_color]))
+        return self.slide_color.strains_eyes
 
 
 class YYCjsPresentation(WithSpecialProps):
@@ -183,15 +1486,21 @@ class YYCjsPresentation(WithSpecialProps):
     nslides = IntProp('Number of powerpoint slides')
     slide_color = ColorProp('RGB color of the slides')
 
+    def summary_lines(self):
+        """Generate a short description of the presentation"""
+        yield 'JavaScripter {name} talking about {topic}.'.format(
+            name=self.presenter,
+            topic=self.topic
+        )
+
     def summarize(self):
         """Print a short description of the presentation. Useful for
         press junkets.
         """
-        print('JavaScripter {name} talking about {topic}.'.format(
-            name=self.presenter,
-            topic=self.topic
-        ))
+        for line in self.summary_lines():
+            print(line)
 
+    @derived('time_limit', 'nslides')
     def time_per_slide(self):
         """Time available for each slide"""
         return self.time_limit / self.nslides
@@ -210,11 +1519,55 @@ class FreeSpiritPresentation(WithSpecialProps):
     presenter = StrProp('Name of presenter')
     favorite_color = ColorProp('Favorite color of presenter')
 
+    def summary_lines(self):
+        """Generate a short description of the presentation"""
+        yield '{name} loves {topic}.'.format(
+            name=self.presenter,
+            topic=self.favorite_color
+        )
+
     def summarize(self):
         """Print a short description of the presentation. Useful for
         press junkets.
         """
-        print('{name} loves {topic}.'.format(
-            name=self.presenter,
-            topic=self.favorite_color
-        ))
+        for line in self.summary_lines():
+            print(line)
+
+
+def write_lines(lines, stream, batch_size=1024):
+    """ This function writes lines to a file-like stream, joining
+    batch_size lines into each write call
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        stream.write('\n'.join(batch) + '\n')
+
+
+def write_notes(presentations, stream, batch_size=1024):
+    """ This function streams the summaries of presentations to stream
+    in a single pass
+    """
+    write_lines(
+        chain.from_iterable(p.summary_lines() for p in presentations),
+        stream,
+        batch_size
+    )
+
+
+def dedupe(instances, exact=True):
+    """ This function lazily yields each of instances that is not equal
+    to one already yielded. It keeps every distinct instance, to
+    compare those whose hashes match. If exact is False, it keeps only
+    their hashes instead, which takes far less memory but also drops an
+    instance whose hash collides with a different earlier one.
+    """
+    seen = set()
+    add = seen.add
+    for obj in instances:
+        count = len(seen)
+        add(obj if exact else hash(obj))
+        if len(seen) != count:
+            yield obj
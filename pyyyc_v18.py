@@ -3,9 +3,71 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from builtins import super
+from collections import Counter
+from itertools import chain
+from itertools import islice
+from weakref import WeakSet
+
 import properties
 
 
+def _strains_eyes(color):
+    return(any([rgb > 200 for rgb in color]) and
+           any([rgb < 50 for rgb in color]))
+
+
+class SlideStats(object):
+    """ class SlideStats
+
+    This class keeps running totals over the slides of a presentation:
+    the slide count, the number of eye-straining slides and a histogram
+    of slide colors. Slides report their own color changes to it.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.straining = 0
+        self.colors = Counter()
+        self._members = Counter()
+        self._counted = {}
+
+    def add(self, slide):
+        color = tuple(slide.slide_color)
+        if self._members[slide] == 0:
+            self._counted[slide] = color
+            if not hasattr(slide, '_stats'):
+                slide._stats = WeakSet()
+            slide._stats.add(self)
+        self._members[slide] += 1
+        self.count += 1
+        self.straining += _strains_eyes(color)
+        self.colors[color] += 1
+
+    def remove(self, slide):
+        color = self._counted[slide]
+        self._members[slide] -= 1
+        if self._members[slide] == 0:
+            del self._members[slide]
+            del self._counted[slide]
+            slide._stats.discard(self)
+        self.count -= 1
+        self.straining -= _strains_eyes(color)
+        self.colors[color] -= 1
+        if self.colors[color] == 0:
+            del self.colors[color]
+
+    def recolor(self, slide):
+        old, new = self._counted[slide], tuple(slide.slide_color)
+        n = self._members[slide]
+        self._counted[slide] = new
+        self.straining += n*(_strains_eyes(new) - _strains_eyes(old))
+        self.colors[old] -= n
+        if self.colors[old] == 0:
+            del self.colors[old]
+        self.colors[new] += n
+
+
 class Person(properties.PropertyClass):
     """ class Person
 
@@ -37,8 +99,12 @@ class Slide(properties.PropertyClass):
     )
 
     def strains_eyes(self):
-        return(any([rgb > 200 for rgb in self.slide_color]) and
-               any([rgb < 50 for rgb in self.slide_color]))
+        return _strains_eyes(self.slide_color)
+
+    def _on_property_change(self, key, pre, post):
+        if key == 'slide_color':
+            for stats in list(getattr(self, '_stats', ())):
+                stats.recolor(self)
 
 
 class PyYYCPresentation(properties.PropertyClass):
@@ -68,28 +134,92 @@ class PyYYCPresentation(properties.PropertyClass):
         repeated=True
     )
 
+    def __init__(self, **kwargs):
+        self._slide_stats = SlideStats()
+        super().__init__(**kwargs)
+
+    def _on_property_change(self, key, pre, post):
+        if key == 'slides':
+            for slide in pre or []:
+                self._slide_stats.remove(slide)
+            for slide in post:
+                self._slide_stats.add(slide)
+
+    def add_slide(self, slide):
+        """Append a slide without revalidating the others"""
+        slide = self._properties['slides'].validator(self, slide)
+        if getattr(self, '_p_slides', None) is None:
+            self._p_slides = []
+        self._p_slides.append(slide)
+        self._mark_dirty('slides')
+        self._slide_stats.add(slide)
+
+    def remove_slide(self, slide):
+        """Remove the first occurrence of a slide"""
+        self._p_slides.remove(slide)
+        self._mark_dirty('slides')
+        self._slide_stats.remove(slide)
+
+    def slide_colors(self):
+        """Number of slides of each color"""
+        return dict(self._slide_stats.colors)
+
+    def summary_lines(self):
+        """Generate a short description of the presentation"""
+        yield 'Pythonista {name} talking about {topic}.'.format(
+            name=self.presenter.name,
+            topic=self.topic
+        )
+
+    def cliff_notes_lines(self):
+        """Generate a long description of the presentation"""
+        for line in self.summary_lines():
+            yield line
+        for i, slide in enumerate(self.slides):
+            yield 'Slide {num}: {topic}'.format(
+                num=i,
+                topic=slide.topic
+            )
+
     def summarize(self):
         """Print a short description of the presentation. Useful for
         press junkets.
         """
-        print('Pythonista {name} talking about {topic}.'.format(
-            name=self.presenter.name,
-            topic=self.topic
-        ))
+        for line in self.summary_lines():
+            print(line)
 
     def cliff_notes(self):
         """Print a long description of the presentation. """
-        self.summarize()
-        for i, slide in enumerate(self.slides):
-            print('Slide {num}: {topic}'.format(
-                num=i,
-                topic=slide.topic
-            ))
+        for line in self.cliff_notes_lines():
+            print(line)
 
     def time_per_slide(self):
         """Time available for each slide"""
-        return self.time_limit / len(self.slides)
+        return self.time_limit / self._slide_stats.count
 
     def strains_eyes(self):
         """Determines if the slides will cause eye strain"""
-        return any(s.strains_eyes() for s in self.slides)
+        return self._slide_stats.straining > 0
+
+
+def write_lines(lines, stream, batch_size=1024):
+    """ This function writes lines to a file-like stream, joining
+    batch_size lines into each write call
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        stream.write('\n'.join(batch) + '\n')
+
+
+def write_cliff_notes(presentations, stream, batch_size=1024):
+    """ This function streams the cliff notes of presentations to
+    stream in a single pass
+    """
+    write_lines(
+        chain.from_iterable(p.cliff_notes_lines() for p in presentations),
+        stream,
+        batch_size
+    )